@@ -0,0 +1,270 @@
+'''Benchmark CPU time and allocations of the import hot functions with synthetic projects'''
+import argparse
+import csv
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# the benchmark runs as a script, the modules it measures are in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from util.columnar import encode_items
+from util.comon import Common
+from util.github import (FIELD_VALUE_TYPES, ProjectV2Field, ProjectV2IterationField, ProjectV2Item,
+                         ProjectV2SingleSelectField, parse_items)
+from util.importer import importer
+from util.manifest import item_counts
+
+# (items, fields, drafts) from a small project to a large migration
+CASES = ((1000, 5, 100), (10000, 20, 1000), (100000, 50, 10000))
+# field values per item, items rarely have a value for every field
+VALUES_PER_ITEM = 10
+OPTIONS_COUNT = 10
+ITERATIONS_COUNT = 6
+PAGE_SIZE = 100
+# timings shorter than this are too noisy to compare with a baseline
+MIN_SECONDS = 0.001
+# field data types in rotation: (field typename, item field value typename)
+FIELD_TYPES = (
+    ('ProjectV2Field', 'ProjectV2ItemFieldTextValue'),
+    ('ProjectV2Field', 'ProjectV2ItemFieldNumberValue'),
+    ('ProjectV2Field', 'ProjectV2ItemFieldDateValue'),
+    ('ProjectV2SingleSelectField', 'ProjectV2ItemFieldSingleSelectValue'),
+    ('ProjectV2IterationField', 'ProjectV2ItemFieldIterationValue')
+)
+
+def synthetic_value(typename, row):
+    '''Get a value of a field value type'''
+    if typename == 'ProjectV2ItemFieldNumberValue':
+        return float(row)
+    if typename == 'ProjectV2ItemFieldDateValue':
+        return f"2024-{row % 12 + 1:02d}-{row % 28 + 1:02d}"
+    if typename == 'ProjectV2ItemFieldSingleSelectValue':
+        return f"Option {row % OPTIONS_COUNT}"
+    if typename == 'ProjectV2ItemFieldIterationValue':
+        return f"Iteration {row % ITERATIONS_COUNT}"
+    return f"Text {row}"
+
+def synthetic_fields(fields):
+    '''Get target project fields as GitHub.get_single_project_for_import returns them'''
+    fields_info = []
+    for index in range(fields):
+        field_typename, _ = FIELD_TYPES[index % len(FIELD_TYPES)]
+        field_id = f"PVTF_{index}"
+        name = f"Field {index}"
+        if field_typename == 'ProjectV2SingleSelectField':
+            options = [{'id': f"O_{index}_{option}", 'name': f"Option {option}"} for option in range(OPTIONS_COUNT)]
+            fields_info.append(ProjectV2SingleSelectField(field_id, name, field_typename, options))
+        elif field_typename == 'ProjectV2IterationField':
+            iterations = [{'id': f"IT_{index}_{iteration}", 'title': f"Iteration {iteration}"}
+                          for iteration in range(ITERATIONS_COUNT)]
+            configuration = {'completedIterations': iterations[:ITERATIONS_COUNT // 2],
+                             'iterations': iterations[ITERATIONS_COUNT // 2:]}
+            fields_info.append(ProjectV2IterationField(field_id, name, field_typename, configuration))
+        else:
+            fields_info.append(ProjectV2Field(field_id, name, field_typename))
+    return fields_info
+
+def synthetic_pages(items, fields, drafts):
+    '''Get pages of item nodes as the export has them, the last items are draft items'''
+    nodes = []
+    for row in range(items):
+        values = []
+        for offset in range(min(fields, VALUES_PER_ITEM)):
+            index = (row + offset) % fields
+            _, typename = FIELD_TYPES[index % len(FIELD_TYPES)]
+            _, key = FIELD_VALUE_TYPES[typename]
+            values.append({'__typename': typename, key: synthetic_value(typename, row), 'field': {'name': f"Field {index}"}})
+        if row >= items - drafts:
+            content = {'id': f"DI_{row}", 'title': f"Draft {row}", 'body': 'body'}
+        else:
+            content = {'id': f"I_{row}", 'number': row + 1, 'title': f"Issue {row}", 'repository': {'name': f"repo{row % 20}"}}
+        nodes.append({'id': f"PVTI_{row}", 'fieldValues': {'nodes': values}, 'content': content})
+    return [nodes[start:start + PAGE_SIZE] for start in range(0, len(nodes), PAGE_SIZE)]
+
+class Case:
+    '''Synthetic project and the inputs of the benchmarked functions'''
+    def __init__(self, items, fields, drafts, folder):
+        self.items = items
+        self.fields = fields
+        self.drafts = min(drafts, items)
+        self.pages = synthetic_pages(items, fields, self.drafts)
+        self.parsed = [item for page in self.pages for item in parse_items(page)]
+        self.values = [value for item in self.parsed for value in item.field_values]
+        self.fields_info = synthetic_fields(fields)
+        self.options = {field.name: field.options for field in self.fields_info if hasattr(field, 'options')}
+        # half of the draft items exist in the target project
+        self.draft_items = [item for item in self.parsed if item.content_type == ProjectV2Item.DRAFT_ISSUE]
+        self.target_drafts = self.draft_items[::2]
+        self.json_path = os.path.join(folder, f"items_{items}_{fields}_{drafts}.json")
+        self.columnar_path = os.path.join(folder, f"columnar_{items}_{fields}_{drafts}.json")
+        self.columnar = encode_items(self.parsed)
+        Common.write_json_to_file(self.json_path, self.pages)
+        Common.write_json_to_file(self.columnar_path, self.columnar)
+
+def bench_parse_items(case):
+    '''parse_items / ProjectV2Item.from_node over the exported pages'''
+    return [item for page in case.pages for item in parse_items(page)]
+
+def bench_decode_items(case):
+    '''decode_items over the columnar export'''
+    return importer.decode_items(case.columnar)
+
+def bench_load_project_data(case):
+    '''load_project_data of the json export'''
+    return importer.load_project_data(case.json_path)
+
+def bench_load_project_data_columnar(case):
+    '''load_project_data of the columnar export'''
+    return importer.load_project_data(case.columnar_path)
+
+def bench_find_field_id_by_name(case):
+    '''find_field_id_by_name for every field value'''
+    return [importer.find_field_id_by_name(value, case.fields_info) for value in case.values]
+
+def bench_find_value_id_in_options(case):
+    '''find_value_id_in_options for every single select value'''
+    return [importer.find_value_id_in_options(case.options[value.field], value.value)
+            for value in case.values if value.field in case.options]
+
+def bench_resolve_field_value(case):
+    '''resolve_field_value for every field value'''
+    return [importer.resolve_field_value(value, case.fields_info) for value in case.values]
+
+def bench_draft_titles(case):
+    '''target_draft_titles and is_draft_inserted for every draft item, as insert_item_pages checks them'''
+    draft_titles = importer.target_draft_titles(case.target_drafts)
+    return [item for item in case.draft_items if not importer.is_draft_inserted(item, draft_titles)]
+
+def bench_item_counts(case):
+    '''item_counts of the manifest over the exported pages'''
+    return item_counts(case.pages)
+
+BENCHMARKS = {
+    'parse_items': bench_parse_items,
+    'decode_items': bench_decode_items,
+    'load_project_data': bench_load_project_data,
+    'load_project_data_columnar': bench_load_project_data_columnar,
+    'find_field_id_by_name': bench_find_field_id_by_name,
+    'find_value_id_in_options': bench_find_value_id_in_options,
+    'resolve_field_value': bench_resolve_field_value,
+    'draft_titles': bench_draft_titles,
+    'item_counts': bench_item_counts
+}
+
+def measure(function, case, repeat):
+    '''Get best time of repeated runs and the allocations of a traced run'''
+    seconds = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        function(case)
+        elapsed = time.perf_counter() - started
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    # tracing slows the run down, allocations are measured separately from time
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = function(case)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    statistics = after.compare_to(before, 'filename')
+    blocks = sum(max(statistic.count_diff, 0) for statistic in statistics)
+    del result
+    return {
+        'seconds': round(seconds, 6),
+        'us_per_item': round(seconds * 1e6 / case.items, 3),
+        'peak_kb': round(peak / 1024, 1),
+        'allocated_blocks': blocks
+    }
+
+def run_benchmarks(cases, names, repeat):
+    '''Run benchmarks over the cases, returns result rows'''
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for items, fields, drafts in cases:
+            case = Case(items, fields, drafts, folder)
+            for name in names:
+                row = {'function': name, 'items': items, 'fields': fields, 'drafts': case.drafts}
+                row.update(measure(BENCHMARKS[name], case, repeat))
+                rows.append(row)
+                print(f"{name} items={items} fields={fields} drafts={case.drafts}: {row['seconds']:.4f} sec",
+                      file=sys.stderr)
+            del case
+    return rows
+
+def compare(rows, baseline_path, tolerance):
+    '''Add the change against baseline rows, returns rows slower than the tolerance'''
+    with open(baseline_path, 'r', encoding='utf-8') as file:
+        baseline = {(row['function'], row['items'], row['fields'], row['drafts']): row for row in json.load(file)}
+    regressions = []
+    for row in rows:
+        previous = baseline.get((row['function'], row['items'], row['fields'], row['drafts']))
+        if not previous or not previous['seconds']:
+            row['change'] = None
+            continue
+        row['change'] = round(row['seconds'] / previous['seconds'] - 1, 3)
+        if row['change'] > tolerance and row['seconds'] >= MIN_SECONDS:
+            regressions.append(row)
+    return regressions
+
+def write_results(rows, output_format, file):
+    '''Write result rows'''
+    if output_format == 'json':
+        file.write(json.dumps(rows, indent=4) + '\n')
+        return
+    header = list(rows[0]) if rows else []
+    if output_format == 'csv':
+        writer = csv.DictWriter(file, fieldnames=header)
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+    cells = [header] + [['' if row[key] is None else str(row[key]) for key in header] for row in rows]
+    widths = [max(len(row[index]) for row in cells) for index in range(len(header))]
+    for row in cells:
+        file.write('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() + '\n')
+
+def parse_case(case):
+    '''Parse ITEMS,FIELDS,DRAFTS'''
+    try:
+        items, fields, drafts = (int(value) for value in case.split(','))
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(f"Invalid case: {case}, expected ITEMS,FIELDS,DRAFTS") from error
+    if items <= 0 or fields <= 0 or drafts < 0:
+        raise argparse.ArgumentTypeError(f"Invalid case: {case}, items and fields must be positive")
+    return items, fields, drafts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark CPU time and allocations of the import hot functions')
+    parser.add_argument('--case', type=parse_case, action='append', default=[],
+                        help='Synthetic project size ITEMS,FIELDS,DRAFTS (repeatable), '
+                             f"default {' '.join(','.join(map(str, case)) for case in CASES)}")
+    parser.add_argument('-f', '--function', action='append', choices=list(BENCHMARKS), default=[],
+                        help='Function to benchmark (repeatable), all by default')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of timed runs, the best is reported')
+    parser.add_argument('--format', choices=['table', 'csv', 'json'], default='table',
+                        help='Output format')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='Compare with the results of an earlier run written with --format json')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Relative slowdown against the baseline reported as regression')
+    args = parser.parse_args()
+
+    # log output is not part of the measured work
+    logging.disable(logging.CRITICAL)
+    results = run_benchmarks(args.case or CASES, args.function or list(BENCHMARKS), max(args.repeat, 1))
+    slower = compare(results, args.baseline, args.tolerance) if args.baseline else []
+    write_results(results, args.format, sys.stdout)
+    for regression in slower:
+        print(f"Regression: {regression['function']} items={regression['items']} fields={regression['fields']} "
+              f"drafts={regression['drafts']} {regression['change']:+.1%}", file=sys.stderr)
+    sys.exit(1 if slower else 0)
@@ -2,8 +2,15 @@
 import argparse
 import logging
 import os
-from util.github import GitHub
+from util.github import GitHub, ProjectV2Item
+from util.columnar import read_items
+from util.views import read_views, view_field_nodes
+from util.archive import ProjectArchive
 from util.comon import Common
+from util.cli import add_common_arguments, apply_common_arguments
+from util.manifest import Manifest, checksum, dataset_path
+from util.profiler import profiler
+from util.progress import progress
 
 def read_project_mapping():
     '''Read project mapping file'''
@@ -14,10 +21,63 @@ def read_project_mapping():
             mapping[key] = value
     return mapping
 
+def check_export_item_counts():
+    '''Check project items in the export files, counts are read from the manifest when the file is as recorded'''
+    project_ids = Common.project_id_list(Common.FOLDER_ITEM_PATH)
+    manifest = Manifest(Common.MANIFEST_FILE_PATH)
+    progress.start('check export', len(project_ids))
+    for project_id in project_ids:
+        file_path = os.path.join(Common.FOLDER_ITEM_PATH, f"{project_id}.json")
+        entry = manifest.get(project_id)
+        if entry and 'items' in entry and entry['bytes'].get('items') == Common.file_size(file_path):
+            count, drafts = entry['items'], entry['drafts']
+        else:
+            items = read_items(file_path)
+            count = len(items)
+            drafts = sum(1 for item in items if item.content_type == ProjectV2Item.DRAFT_ISSUE)
+        logging.info('Check Completed: Export, Project ID: %s, Item Count: %s, Draft Count: %s',
+                     project_id, count, drafts)
+        progress.finish_project(project_id)
+
+def check_export_manifest():
+    '''Check export files against the sizes and checksums in the manifest'''
+    manifest = Manifest(Common.MANIFEST_FILE_PATH)
+    progress.start('check manifest', len(manifest.projects))
+    for project_id, entry in manifest.projects.items():
+        mismatches = []
+        for dataset, expected in entry['checksums'].items():
+            try:
+                content = Common.read_bytes_from_file(dataset_path(project_id, dataset))
+            except FileNotFoundError:
+                mismatches.append(f"{dataset} missing")
+                continue
+            if len(content) != entry['bytes'][dataset] or checksum(content) != expected:
+                mismatches.append(f"{dataset} changed")
+        if mismatches:
+            logging.error('Check Failed: Manifest, Project ID: %s, %s', project_id, ', '.join(mismatches))
+        else:
+            logging.info('Check Completed: Manifest, Project ID: %s, Datasets: %s, Items: %s, Drafts: %s, Fields: %s',
+                         project_id, len(entry['checksums']), entry.get('items'), entry.get('drafts'), entry.get('fields'))
+        progress.finish_project(project_id)
+
+def check_export_views():
+    '''Check project views in the export files resolve to exported fields'''
+    project_ids = Common.project_id_list(Common.FOLDER_VIEWS_PATH)
+    progress.start('check export views', len(project_ids))
+    for project_id in project_ids:
+        views = read_views(os.path.join(Common.FOLDER_VIEWS_PATH, f"{project_id}.json"),
+                           os.path.join(Common.FOLDER_FIELDS_PATH, f"{project_id}.json"))
+        nodes = [node for page in views for view in page for node in view_field_nodes(view)]
+        unresolved = sum(1 for node in nodes if 'name' not in node)
+        logging.info('Check Completed: Export Views, Project ID: %s, View Count: %s, Field References: %s, Unresolved: %s',
+                     project_id, sum(len(page) for page in views), len(nodes), unresolved)
+        progress.finish_project(project_id)
+
 def check_project_item_counts(organization, auth_token, project_type):
     '''Check project items'''
     github = GitHub(organization, auth_token)
     project_ids = Common.project_id_list(Common.FOLDER_PATH)
+    progress.start(f'check {project_type}', len(project_ids))
     for project_id in project_ids:
         if project_type == 'target':
             project_mapping = read_project_mapping()
@@ -27,22 +87,24 @@ def check_project_item_counts(organization, auth_token, project_type):
         count = github.get_project_items_count(project_id)
         logging.info('Check Completed: Org %s, Project ID: %s, Item Count: %s',
                      organization, project_id, count)
+        progress.finish_project(project_id)
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        level = logging.INFO,
-        format = "%(asctime)s [%(levelname)s] %(message)s",
-        handlers = [
-            logging.FileHandler("check.log"),
-            logging.StreamHandler()
-        ])
-
     parser = argparse.ArgumentParser(description='Check GitHub project')
     parser.add_argument('-o', '--operation',
-                        choices=['check-item-source', 'check-item-target'],
-                        help='Operation to perform (check-item-source, check-item-target)')
+                        choices=['check-item-source', 'check-item-target', 'check-item-export', 'check-view-export',
+                                 'check-manifest'],
+                        help='Operation to perform (check-item-source, check-item-target, check-item-export, check-view-export, check-manifest)')
+    parser.add_argument('--archive', metavar='FILE',
+                        help='Read the exported datasets from an archive written by export.py --archive')
+    add_common_arguments(parser, concurrency=False)
     args = parser.parse_args()
 
+    apply_common_arguments(args, "check.log")
+
+    if args.archive:
+        Common.ARCHIVE = ProjectArchive(args.archive)
+
     org = os.environ['GITHUB_ORG']
     token = os.environ['GITHUB_TOKEN']
     org_target = os.environ['GITHUB_ORG_TARGET']
@@ -61,5 +123,14 @@ if __name__ == '__main__':
         check_project_item_counts(org, token, project_type='source')
     elif args.operation == 'check-item-target':
         check_project_item_counts(org_target, token_target, project_type='target')
+    elif args.operation == 'check-item-export':
+        check_export_item_counts()
+    elif args.operation == 'check-view-export':
+        check_export_views()
+    elif args.operation == 'check-manifest':
+        check_export_manifest()
     else:
-        print ('usage: check.py [-h] [-o {check-item-source, check-item-target}]')
+        print ('usage: check.py [-h] [-o {check-item-source, check-item-target, check-item-export, check-view-export, check-manifest}]')
+
+    progress.report(force=True)
+    profiler.write('check')
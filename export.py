@@ -1,47 +1,146 @@
 """Export GitHub project information"""
 import argparse
+import concurrent.futures
 import logging
 import os
-from util.github import GitHub
+import re
+from util.github import GitHub, Project, parse_items
+from util.columnar import COLUMNAR_FORMAT, encode_items
+from util.archive import ProjectArchive
 from util.comon import Common
+from util.cli import add_common_arguments, apply_common_arguments
+from util.manifest import Manifest, dataset_path, item_counts, page_count
+from util.budget import PRIORITIES, EXPLICIT, LISTED, RunSchedule
+from util.profiler import profiler
+from util.progress import progress
 
-def create_directories():
+def create_directories(root=''):
     '''Create necessary directories'''
-    os.makedirs(Common.FOLDER_PATH, exist_ok=True)
-    os.makedirs(Common.FOLDER_FIELDS_PATH, exist_ok=True)
-    os.makedirs(Common.FOLDER_VIEWS_PATH, exist_ok=True)
-    os.makedirs(Common.FOLDER_ITEM_PATH, exist_ok=True)
+    Common.create_folder(os.path.join(root, Common.FOLDER_PATH))
+    Common.create_folder(os.path.join(root, Common.FOLDER_FIELDS_PATH))
+    Common.create_folder(os.path.join(root, Common.FOLDER_VIEWS_PATH))
+    Common.create_folder(os.path.join(root, Common.FOLDER_ITEM_PATH))
 
-def export_github_projects(organization, auth_token, include_all):
-    '''Export GitHub project information'''
+def items_data(items):
+    '''Get items data in the export format'''
+    if Common.ITEMS_FORMAT == COLUMNAR_FORMAT:
+        return encode_items([item for page in items for item in parse_items(page)])
+    return items
+
+def write_dataset(manifest, file_path, project_id, dataset, data, updated_at=None):
+    '''Write a dataset of a project and record its counts, size and checksum in the manifest'''
+    if dataset == 'items':
+        counts = item_counts(data)
+    elif dataset in ('fields', 'views'):
+        counts = {dataset: page_count(data)}
+    else:
+        counts = None
+    content = Common.write_json_to_file(file_path, data)
+    manifest.record(project_id, dataset, content, counts, updated_at)
+
+def projects_updated_at(github, project_ids):
+    '''Get update time of projects for the manifest, empty if not available'''
+    try:
+        return github.get_projects_updated_at(project_ids)
+    except Exception as general_error:
+        logging.warning('Projects Updated At Not Available - %s', str(general_error))
+        return {}
 
+def export_github_projects(organization, auth_token, include_all, schedule=None, root='', incremental=False):
+    '''Export GitHub project information'''
+    schedule = schedule or RunSchedule('export all' if include_all else 'export projects')
     github = GitHub(organization, auth_token)
-    projects = github.get_projects(include_all)
-
-    for project in projects:
-        logging.info('Project ID: %s', project.project_id)
-        Common.write_json_to_file(os.path.join(Common.FOLDER_PATH,
-                                               f"{project.project_id}.json"), project.project_meta)
-        if include_all:
-            Common.write_json_to_file(os.path.join(Common.FOLDER_FIELDS_PATH,
-                                                   f"{project.project_id}.json"), project.fields)
-            Common.write_json_to_file(os.path.join(Common.FOLDER_VIEWS_PATH,
-                                                   f"{project.project_id}.json"), project.views)
-            Common.write_json_to_file(os.path.join(Common.FOLDER_ITEM_PATH,
-                                                   f"{project.project_id}.json"), project.items)
-
-def export_github_project_data(organization, auth_token, data_type, folder_path):
+    schedule.track(github.token_pool)
+    manifest = Manifest(os.path.join(root, Common.MANIFEST_FILE_PATH))
+    try:
+        projects = github.get_projects()
+
+        for project in projects:
+            logging.info('Project ID: %s', project.project_id)
+            write_dataset(manifest, dataset_path(project.project_id, 'project', root),
+                          project.project_id, 'project', project.project_meta)
+        if not include_all:
+            return
+
+        projects = {project.project_id: project for project in projects}
+        project_ids = schedule.plan(list(projects), github.get_project_items_count)
+        updated_at = projects_updated_at(github, project_ids)
+        progress.start('export', len(project_ids))
+        # projects are fetched page by page, several projects keep the concurrency limits busy
+        with concurrent.futures.ThreadPoolExecutor(max_workers=github.session.workers()) as executor:
+            futures = [executor.submit(export_project, projects[project_id], github, schedule, manifest,
+                                       updated_at.get(project_id), root, incremental)
+                       for project_id in project_ids]
+            for future in futures:
+                future.result()
+    finally:
+        manifest.write()
+
+def export_project(project, github, schedule, manifest, updated_at, root='', incremental=False):
+    '''Export fields, views and items of a project'''
+    project_id = project.project_id
+    if not schedule.proceed():
+        return
+    if incremental and all(manifest.unchanged(project_id, dataset, updated_at)
+                           for dataset in ('fields', 'views', 'items')):
+        logging.info('Export Skipped (Not updated since last export) - Project ID: %s', project_id)
+    else:
+        project.fetch_fields(github)
+        project.fetch_views(github)
+        project.fetch_items(github)
+        write_dataset(manifest, dataset_path(project_id, 'fields', root), project_id, 'fields',
+                      project.fields, updated_at)
+        write_dataset(manifest, dataset_path(project_id, 'views', root), project_id, 'views',
+                      project.views, updated_at)
+        write_dataset(manifest, dataset_path(project_id, 'items', root), project_id, 'items',
+                      items_data(project.items), updated_at)
+    schedule.done(project_id)
+    progress.finish_project(project_id)
+
+def exported_fields(project_id, root=''):
+    '''Get exported fields of a project to build the items query from, None if not exported'''
+    try:
+        return Common.read_json_from_file(os.path.join(root, Common.FOLDER_FIELDS_PATH, f"{project_id}.json"))
+    except FileNotFoundError:
+        return None
+
+def export_github_project_data(organization, auth_token, data_type, folder_path, schedule=None, root='',
+                               incremental=False):
     '''Export GitHub project data based on type'''
 
     # check if Project folder exists
-    if not os.path.exists(Common.FOLDER_PATH):
-        logging.error("Folder %s does not exist", Common.FOLDER_PATH)
+    if not Common.folder_exists(os.path.join(root, Common.FOLDER_PATH)):
+        logging.error("Folder %s does not exist", os.path.join(root, Common.FOLDER_PATH))
         return
 
     # get project items from the project id from json files
+    schedule = schedule or RunSchedule(f'export {data_type}')
     github = GitHub(organization, auth_token)
-    project_ids = Common.project_id_list(Common.FOLDER_PATH)
-    for project_id in project_ids:
+    schedule.track(github.token_pool)
+    manifest = Manifest(os.path.join(root, Common.MANIFEST_FILE_PATH))
+    project_ids = schedule.plan(Common.project_id_list(os.path.join(root, Common.FOLDER_PATH)), github.get_project_items_count)
+    updated_at = projects_updated_at(github, project_ids)
+    progress.start(f'export {data_type}', len(project_ids))
+    try:
+        # projects are fetched page by page, several projects keep the concurrency limits busy
+        with concurrent.futures.ThreadPoolExecutor(max_workers=github.session.workers()) as executor:
+            futures = [executor.submit(export_project_data, project_id, github, data_type, folder_path, schedule,
+                                       manifest, updated_at.get(project_id), root, incremental)
+                       for project_id in project_ids]
+            for future in futures:
+                future.result()
+    finally:
+        manifest.write()
+
+def export_project_data(project_id, github, data_type, folder_path, schedule, manifest, updated_at, root='',
+                        incremental=False):
+    '''Export data of a project based on type'''
+    if not schedule.proceed():
+        return
+    if incremental and manifest.unchanged(project_id, data_type, updated_at):
+        logging.info('Export Skipped (Not updated since last export) - Project ID: %s, Data: %s',
+                     project_id, data_type)
+    else:
         if data_type == 'fields':
             project = github.fetch_project_fields(project_id)
             data = project.fields
@@ -49,59 +148,148 @@ def export_github_project_data(organization, auth_token, data_type, folder_path)
             project = github.fetch_project_views(project_id)
             data = project.views
         elif data_type == 'items':
-            project = github.fetch_project_items(project_id)
-            data = project.items
+            project = github.fetch_project_items(project_id, exported_fields(project_id, root))
+            data = items_data(project.items)
         else:
             raise ValueError(f"Unknown data type: {data_type}")
 
-        Common.write_json_to_file(os.path.join(folder_path, f"{project_id}.json"), data)
+        write_dataset(manifest, os.path.join(root, folder_path, f"{project_id}.json"), project_id, data_type,
+                      data, updated_at)
+    schedule.done(project_id)
+    progress.finish_project(project_id)
 
-def export_github_project_fields(organization, auth_token):
+def export_github_project_fields(organization, auth_token, schedule=None, root='', incremental=False):
     '''Export GitHub project fields'''
-    export_github_project_data(organization, auth_token, 'fields', Common.FOLDER_FIELDS_PATH)
+    export_github_project_data(organization, auth_token, 'fields', Common.FOLDER_FIELDS_PATH, schedule, root, incremental)
 
-def export_github_project_views(organization, auth_token):
+def export_github_project_views(organization, auth_token, schedule=None, root='', incremental=False):
     '''Export GitHub project views'''
-    export_github_project_data(organization, auth_token, 'views', Common.FOLDER_VIEWS_PATH)
+    export_github_project_data(organization, auth_token, 'views', Common.FOLDER_VIEWS_PATH, schedule, root, incremental)
 
-def export_github_project_items(organization, auth_token):
+def export_github_project_items(organization, auth_token, schedule=None, root='', incremental=False):
     '''Export GitHub project items'''
-    export_github_project_data(organization, auth_token, 'items', Common.FOLDER_ITEM_PATH)
+    export_github_project_data(organization, auth_token, 'items', Common.FOLDER_ITEM_PATH, schedule, root, incremental)
 
-if __name__ == '__main__':
-    logging.basicConfig(
-        level = logging.INFO,
-        format = "%(asctime)s [%(levelname)s] %(message)s",
-        handlers = [
-            logging.FileHandler("export.log"),
-            logging.StreamHandler()
-        ])
+def organization_token(organization):
+    '''Get token of an organization from GITHUB_TOKEN_<ORG>, GITHUB_TOKEN if not set'''
+    name = 'GITHUB_TOKEN_' + re.sub('[^A-Z0-9]', '_', organization.upper())
+    token = os.environ.get(name) or os.environ.get('GITHUB_TOKEN')
+    if not token:
+        raise KeyError(f"The '{name}' or 'GITHUB_TOKEN' environment variable is missing.")
+    return token
+
+def export_organization(organization, auth_token, operation, schedule, root='', incremental=False):
+    '''Export an organization into its output root'''
+    create_directories(root)
+    if operation == 'all':
+        export_github_projects(organization, auth_token, True, schedule, root, incremental)
+    elif operation == 'projects':
+        export_github_projects(organization, auth_token, False, schedule, root)
+    elif operation == 'fields':
+        export_github_project_fields(organization, auth_token, schedule, root, incremental)
+    elif operation == 'views':
+        export_github_project_views(organization, auth_token, schedule, root, incremental)
+    elif operation == 'items':
+        export_github_project_items(organization, auth_token, schedule, root, incremental)
+    else:
+        raise ValueError(f"Unknown operation: {operation}")
+
+def export_organizations(organizations, operation, schedules, output_root, workers, incremental=False):
+    '''Export organizations concurrently, each into <output_root>/<org>'''
+    progress.combine(f'export {operation}')
+    # an organization without a token is skipped, the others are exported
+    tokens = {}
+    for organization in organizations:
+        try:
+            tokens[organization] = organization_token(organization)
+        except KeyError as key_error:
+            logging.error('Export Organization Failed - %s: %s', organization, str(key_error))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(export_organization, organization, token, operation,
+                                   schedules[organization], os.path.join(output_root, organization),
+                                   incremental): organization
+                   for organization, token in tokens.items()}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+                logging.info('Export Organization Completed - %s', futures[future])
+            except Exception as general_error:
+                logging.error('Export Organization Failed - %s: %s', futures[future], str(general_error))
 
+if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Export GitHub project data.')
     parser.add_argument('-o', '--operation',
                         choices=['all', 'projects', 'fields', 'views', 'items'],
                         required=True, help='Operation to perform')
+    parser.add_argument('--format', choices=['json', COLUMNAR_FORMAT], default='json',
+                        help='Format of the items files, columnar stores items column-wise with dictionary-encoded values')
+    parser.add_argument('--time-budget', type=int, metavar='SECONDS',
+                        help='Stop starting new projects after this many seconds')
+    parser.add_argument('--point-budget', type=int, metavar='POINTS',
+                        help='Stop starting new projects after this many rate-limit points are used')
+    parser.add_argument('--priority', choices=PRIORITIES, default=LISTED,
+                        help='Project order: listed, explicit (--projects), largest or smallest first')
+    parser.add_argument('--projects', default='',
+                        help='Comma-separated project IDs to export in this order (with --priority explicit)')
+    parser.add_argument('--resume', action='store_true',
+                        help=f'Skip projects completed by the last run of the operation, kept in {Common.RUN_STATE_FILE_PATH}')
+    parser.add_argument('--incremental', action='store_true',
+                        help=f'Skip projects not updated since their last export, recorded in {Common.MANIFEST_FILE_PATH}')
+    parser.add_argument('--normalize-views', action='store_true',
+                        help='Export view fields as field ids only, joined with the exported fields when read')
+    parser.add_argument('--orgs', default='',
+                        help='Comma-separated organizations to export concurrently instead of GITHUB_ORG, '
+                             'each with the token in GITHUB_TOKEN_<ORG> or GITHUB_TOKEN')
+    parser.add_argument('--output-root', default='.',
+                        help='Folder holding the output folder of each organization (with --orgs)')
+    parser.add_argument('--org-workers', type=int,
+                        help='Number of organizations exported at a time, all by default (with --orgs)')
+    parser.add_argument('--archive', metavar='FILE',
+                        help='Write all datasets into a single compressed archive instead of the folders')
+    parser.add_argument('--pretty', action='store_true',
+                        help='Write indented JSON files instead of compact ones')
+    add_common_arguments(parser)
     args = parser.parse_args()
+    if args.priority == EXPLICIT and not any(args.projects.split(',')):
+        parser.error('--priority explicit requires --projects')
 
-    org = os.environ['GITHUB_ORG']
-    token = os.environ['GITHUB_TOKEN']
+    Common.PRETTY_JSON = args.pretty
+    Common.ITEMS_FORMAT = args.format
+    Project.normalize_views = args.normalize_views
+    if args.archive:
+        # all and projects start a new archive, other operations, resumed and incremental runs add to it
+        archive_mode = 'w' if args.operation in ('all', 'projects') and not (args.resume or args.incremental) else 'a'
+        Common.ARCHIVE = ProjectArchive(args.archive, archive_mode)
+    apply_common_arguments(args, "export.log")
 
-    if not org:
-        raise KeyError("The 'GITHUB_ORG' environment variable is missing.")
-    if not token:
-        raise KeyError("The 'GITHUB_TOKEN' environment variable is missing.")
-
-    create_directories()
-
-    if args.operation == 'all':
-        export_github_projects(org, token, True)
-    elif args.operation == 'projects':
-        export_github_projects(org, token, False)
-    elif args.operation == 'fields':
-        export_github_project_fields(org, token)
-    elif args.operation == 'views':
-        export_github_project_views(org, token)
-    elif args.operation == 'items':
-        export_github_project_items(org, token)
+
+    project_list = [project_id for project_id in args.projects.split(',') if project_id]
+    orgs = [org for org in args.orgs.split(',') if org]
+    if orgs:
+        org_schedules = {}
+        for org in orgs:
+            # run state is kept on disk next to the output even with --archive
+            os.makedirs(os.path.join(args.output_root, org), exist_ok=True)
+            org_schedules[org] = RunSchedule(f'export {args.operation}', args.time_budget, args.point_budget,
+                                             args.priority, project_list,
+                                             os.path.join(args.output_root, org, Common.RUN_STATE_FILE_PATH),
+                                             args.resume)
+        export_organizations(orgs, args.operation, org_schedules, args.output_root,
+                             args.org_workers or len(orgs), args.incremental)
     else:
-        print("usage: export.py [-h] -o {all,projects,fields,views,items}")
+        org = os.environ['GITHUB_ORG']
+        token = os.environ['GITHUB_TOKEN']
+
+        if not org:
+            raise KeyError("The 'GITHUB_ORG' environment variable is missing.")
+        if not token:
+            raise KeyError("The 'GITHUB_TOKEN' environment variable is missing.")
+
+        run_schedule = RunSchedule(f'export {args.operation}', args.time_budget, args.point_budget, args.priority,
+                                   project_list, Common.RUN_STATE_FILE_PATH, args.resume)
+        export_organization(org, token, args.operation, run_schedule, incremental=args.incremental)
+
+    if Common.ARCHIVE:
+        Common.ARCHIVE.close()
+    progress.report(force=True)
+    profiler.write('export')
@@ -1,10 +1,24 @@
 '''Import GitHub project'''
 import argparse
-import json
 import logging
 import os
-from util.github import GitHub
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from util.github import GitHub, ProjectV2Item, parse_field_value, parse_items
+from util.columnar import decode_items, is_columnar
+from util.archive import ProjectArchive
 from util.comon import Common
+from util.cli import add_common_arguments, apply_common_arguments
+from util.manifest import ImportedExports, Manifest
+from util.budget import PRIORITIES, EXPLICIT, LISTED, RunSchedule
+from util.deadletter import FIELD, FIELD_VALUE, ITEM, DRAFT, UNITS, dead_letters, item_node, value_node
+from util.githubsession import GitHubSession
+from util.idempotency import IntentJournal
+from util.profiler import profiler
+from util.progress import progress
+
+# issue/PR items are inserted from several threads into one mapping file
+MAPPING_LOCK = threading.Lock()
 
 def read_project_mapping():
     '''Read project mapping file'''
@@ -15,222 +29,394 @@ def read_project_mapping():
             mapping[key] = value
     return mapping
 
-def import_github_project(organization, auth_token):
+def import_github_project(organization, auth_token, use_templates=False, schedule=None):
     '''Import GitHub project'''
+    schedule = schedule or RunSchedule('import projects')
     github = GitHub(organization, auth_token)
+    schedule.track(github.token_pool)
     json_files = Common.get_json_files(Common.FOLDER_PATH)
     owner_id = github.get_ownerid()
-
-    with open(Common.MAPPING_FILE_PATH, 'w', encoding='utf-8') as mapping_file:
-        for json_file in json_files:
-            project_id = json_file.split('.')[0]
-            create_project(project_id, github, owner_id,
-                           os.path.join(Common.FOLDER_PATH, json_file),
-                           mapping_file)
+    project_ids = schedule.plan([json_file.split('.')[0] for json_file in json_files], project_size)
+    groups = group_projects_by_schema(project_ids) if use_templates else [[project_id] for project_id in project_ids]
+
+    progress.start('import projects', len(project_ids))
+    # a resumed run adds to the mapping of the earlier run
+    with open(Common.MAPPING_FILE_PATH, 'a' if schedule.completed else 'w', encoding='utf-8') as mapping_file:
+        for group in groups:
+            template_id = None
+            for project_id in group:
+                if not schedule.proceed():
+                    return
+                file_path = os.path.join(Common.FOLDER_PATH, f"{project_id}.json")
+                if template_id:
+                    copy_project(project_id, github, owner_id, template_id, file_path, mapping_file)
+                else:
+                    target_project_id = create_project(project_id, github, owner_id, file_path, mapping_file)
+                    if target_project_id and len(group) > 1:
+                        # the first project of the group is the template of the others
+                        create_fields(project_id, github,
+                                      os.path.join(Common.FOLDER_FIELDS_PATH, f"{project_id}.json"),
+                                      target_project_id)
+                        template_id = target_project_id
+                mapping_file.flush()
+                schedule.done(project_id)
+                progress.finish_project(project_id)
+
+def project_size(project_id):
+    '''Get size of the exported items of a project to rank projects by'''
+    return Common.file_size(os.path.join(Common.FOLDER_ITEM_PATH, f"{project_id}.json"))
+
+def field_schema(project_id):
+    '''Get field definitions (name, type, options) of an exported project, None if not exported'''
+    file_path = os.path.join(Common.FOLDER_FIELDS_PATH, f"{project_id}.json")
+    try:
+        project_data = Common.read_json_from_file(file_path)
+    except FileNotFoundError:
+        return None
+    schema = []
+    for project_fields in project_data or []:
+        for field in project_fields:
+            options = tuple((option['name'], option.get('color'), option.get('description'))
+                            for option in field.get('options') or [])
+            schema.append((field['name'], field['dataType'], options))
+    return tuple(sorted(schema, key=lambda field: field[0]))
+
+def group_projects_by_schema(project_ids):
+    '''Group projects with identical field definitions'''
+    groups = {}
+    for project_id in project_ids:
+        schema = field_schema(project_id)
+        # projects without exported fields are created on their own
+        groups.setdefault(schema if schema else project_id, []).append(project_id)
+    logging.info('Project Schemas - Projects: %s, Schemas: %s', len(project_ids), len(groups))
+    return list(groups.values())
 
 def create_project(project_id, github, owner_id, file_path, mapping_file):
-    '''Create project'''
+    '''Create project, returns the target project id or None if failed'''
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            project_data = json.load(file)
-            logging.info('Create Project - %s', project_id)
-
-            # project create & update
-            target_project_id = github.create_project(project_data, owner_id)
-            source_project_id = project_data['id']
-            updated_project_id, updated_project_title = github.update_project(target_project_id, project_data)
-            mapping_file.write(f"{source_project_id} -> {target_project_id}\n")
-            logging.info('Create Project Succeeded - Id:%s Title:%s',
-                         updated_project_id,
-                         updated_project_title)
+        project_data = Common.read_json_from_file(file_path)
+        logging.info('Create Project - %s', project_id)
+
+        # project create & update
+        target_project_id = github.create_project(project_data, owner_id)
+        source_project_id = project_data['id']
+        updated_project_id, updated_project_title = github.update_project(target_project_id, project_data)
+        mapping_file.write(f"{source_project_id} -> {target_project_id}\n")
+        logging.info('Create Project Succeeded - Id:%s Title:%s',
+                     updated_project_id,
+                     updated_project_title)
+        return target_project_id
 
     except FileNotFoundError as fnf_error:
         logging.error('File not found - %s %s', file_path, str(fnf_error))
     except Exception as general_error:
         logging.error('Create Project Failed - %s: %s', project_id, str(general_error))
+    return None
+
+def copy_project(project_id, github, owner_id, template_id, file_path, mapping_file):
+    '''Create project as a copy of the template project with the same fields'''
+    try:
+        project_data = Common.read_json_from_file(file_path)
+        logging.info('Copy Project - %s Template:%s', project_id, template_id)
+
+        # project copy & update
+        target_project_id = github.copy_project(template_id, project_data, owner_id)
+        source_project_id = project_data['id']
+        updated_project_id, updated_project_title = github.update_project(target_project_id, project_data)
+        mapping_file.write(f"{source_project_id} -> {target_project_id}\n")
+        logging.info('Create Project Succeeded (Copy) - Id:%s Title:%s',
+                     updated_project_id,
+                     updated_project_title)
+
+    except FileNotFoundError as fnf_error:
+        logging.error('File not found - %s %s', file_path, str(fnf_error))
+    except Exception as general_error:
+        logging.error('Copy Project Failed - %s: %s', project_id, str(general_error))
 
-def import_github_project_fields(organization, auth_token):
+def import_github_project_fields(organization, auth_token, schedule=None, incremental=False):
     '''Import GitHub project fields'''
+    schedule = schedule or RunSchedule('import fields')
     github = GitHub(organization, auth_token)
-    project_ids = Common.project_id_list(Common.FOLDER_FIELDS_PATH)
+    schedule.track(github.token_pool)
+    project_ids = schedule.plan(Common.project_id_list(Common.FOLDER_FIELDS_PATH), project_size)
     project_mapping = read_project_mapping()
-
-    for project_id in project_ids:
-        mapped_project_id = project_mapping.get(project_id)
-        create_fields(project_id, github,
-                        os.path.join(Common.FOLDER_FIELDS_PATH, f"{project_id}.json"),
-                        mapped_project_id)
-
-def field_exists(field_name, mapped_project_fields_info):
-    '''Check if field exists'''
-    return any(field_name == mapped_field.name for mapped_field in mapped_project_fields_info[0])
-
-def create_field(github, mapped_project_id, field):
-    '''Create field'''
-    field_id = field['id']
-    field_name = field['name']
-    field_type = field['dataType']
-    logging.info('Create Field - Id:%s Name:%s', field_id, field_name)
-
-    if field_type == 'SINGLE_SELECT':
-        options = field['options']
-        options_names = [{'color': option['color'], 'description': option['description'], 'name': option['name']} for option in options]
-        github.create_field_selection(mapped_project_id, field_type, field_name, options_names)
-        logging.info('Create Field Succeeded - Id:%s Name:%s', field_id, field_name)
-    elif field_type == 'ITERATION':
-        logging.info('Create Field Skipped (Iteration) - Id:%s Name:%s', field_id, field_name)
+    manifest = Manifest(Common.MANIFEST_FILE_PATH)
+    imported = ImportedExports(Common.IMPORTED_FILE_PATH)
+
+    progress.start('import fields', len(project_ids))
+    # projects are independent, the concurrency limits decide how many of their requests are in flight
+    with ThreadPoolExecutor(max_workers=github.session.workers()) as executor:
+        futures = [executor.submit(import_project_fields, project_id, github, project_mapping.get(project_id), schedule,
+                                   manifest, imported, incremental)
+                   for project_id in project_ids]
+        for future in futures:
+            future.result()
+
+def import_project_fields(project_id, github, mapped_project_id, schedule, manifest, imported, incremental=False):
+    '''Import fields of a single project, incremental skips fields imported from the same export'''
+    if not schedule.proceed():
+        return
+    if incremental and imported.unchanged(manifest, project_id, 'fields', mapped_project_id):
+        logging.info('Create Fields Skipped (Export unchanged) - Project ID: %s, Mapped Project ID: %s',
+                     project_id, mapped_project_id)
     else:
-        github.create_field(mapped_project_id, field_type, field_name)
-        logging.info('Create Field Succeeded - Id:%s Name:%s', field_id, field_name)
+        if create_fields(project_id, github,
+                         os.path.join(Common.FOLDER_FIELDS_PATH, f"{project_id}.json"),
+                         mapped_project_id):
+            imported.record(manifest, project_id, 'fields', mapped_project_id)
+    schedule.done(project_id)
+    progress.finish_project(project_id)
+
+def field_spec(field):
+    '''Get (data_type, name, options) of an exported field for create_fields'''
+    options = None
+    if field['dataType'] == 'SINGLE_SELECT':
+        options = [{'color': option['color'], 'description': option['description'], 'name': option['name']}
+                   for option in field['options']]
+    return field['dataType'], field['name'], options
 
 def create_fields(project_id, github, file_path, mapped_project_id):
-    '''Create fields'''
+    '''Create fields, returns False if the project failed'''
     try:
-        logging.info('Create Fields Started - Project ID: %s, Mapped Project ID: %s', project_id, mapped_project_id)
         project_data = load_project_data(file_path)
-        if not project_data:
-            return
-
-        # get current project fields
-        mapped_project_fields_info = github.get_single_project_for_import(mapped_project_id)
-
-        # create fields
-        succeed = 0
-        skip = 0
-        fail = 0
-        for project_fields in project_data:
-            for field in project_fields:
-                try:
-                    if not (isinstance(field, dict) and 'id' in field and 'name' in field and 'dataType' in field):
-                        break
-
-                    # check if field exists
-                    if field_exists(field['name'], mapped_project_fields_info):
-                        logging.info('Create Field Skipped (Name already exists) - Id:%s Name:%s', field['id'], field['name'])
-                        skip = skip + 1
-                    else:
-                        create_field(github, mapped_project_id, field)
-                        succeed = succeed + 1
-                except Exception as item_error:
-                        logging.error('Create Fields Failed - %s: %s', project_id, str(item_error))
-                        fail = fail + 1
-
-        logging.info('Create Fields Completed - Project ID: %s, Mapped Project ID: %s, Succeed: %s, Skip: %s, Fail: %s',
-                     project_id, mapped_project_id, succeed, skip, fail)
+        if project_data:
+            create_fields_from_data(project_id, github, project_data, mapped_project_id)
+        return True
 
     except FileNotFoundError as fnf_error:
         logging.error('File not found - %s %s', file_path, str(fnf_error))
     except Exception as general_error:
         logging.error('Create Fields Failed - %s: %s', project_id, str(general_error))
-
-def import_github_project_items(organization, auth_token):
+    return False
+
+def create_fields_from_data(project_id, github, project_data, mapped_project_id):
+    '''Create fields from pages of project fields'''
+    logging.info('Create Fields Started - Project ID: %s, Mapped Project ID: %s', project_id, mapped_project_id)
+
+    # names of current project fields
+    mapped_fields, _ = github.get_single_project_for_import(mapped_project_id)
+    field_names = {mapped_field.name for mapped_field in mapped_fields}
+
+    # collect fields to create
+    skip = 0
+    pending = []
+    for project_fields in project_data:
+        for field in project_fields:
+            if not (isinstance(field, dict) and 'id' in field and 'name' in field and 'dataType' in field):
+                break
+
+            if field['name'] in field_names:
+                logging.info('Create Field Skipped (Name already exists) - Id:%s Name:%s', field['id'], field['name'])
+                skip = skip + 1
+            elif field['dataType'] == 'ITERATION':
+                logging.info('Create Field Skipped (Iteration) - Id:%s Name:%s', field['id'], field['name'])
+            else:
+                # also skips duplicate names within the export
+                field_names.add(field['name'])
+                pending.append(field)
+
+    # create fields
+    succeed = 0
+    fail = 0
+    try:
+        errors = github.create_fields(mapped_project_id, [field_spec(field) for field in pending])
+    except Exception as batch_error:
+        # every field of a raising batch is failed
+        errors = [batch_error] * len(pending)
+    for field, error in zip(pending, errors):
+        if error:
+            logging.error('Create Field Failed - Id:%s Name:%s: %s', field['id'], field['name'], error)
+            dead_letters.record(FIELD, project_id, mapped_project_id, field, error)
+            fail = fail + 1
+        else:
+            logging.info('Create Field Succeeded - Id:%s Name:%s', field['id'], field['name'])
+            succeed = succeed + 1
+
+    logging.info('Create Fields Completed - Project ID: %s, Mapped Project ID: %s, Succeed: %s, Skip: %s, Fail: %s',
+                 project_id, mapped_project_id, succeed, skip, fail)
+
+def import_github_project_items(organization, auth_token, schedule=None, incremental=False):
     '''Import GitHub project items'''
+    schedule = schedule or RunSchedule('import items')
     github = GitHub(organization, auth_token)
-    project_ids = Common.project_id_list(Common.FOLDER_ITEM_PATH)
+    schedule.track(github.token_pool)
+    project_ids = schedule.plan(Common.project_id_list(Common.FOLDER_ITEM_PATH), project_size)
     project_mapping = read_project_mapping()
+    manifest = Manifest(Common.MANIFEST_FILE_PATH)
+    imported = ImportedExports(Common.IMPORTED_FILE_PATH)
 
-    with open(Common.MAPPING_ITEMS_FILE_PATH, 'w', encoding='utf-8') as mapping_file:
+    progress.start('import items', len(project_ids))
+    # a resumed run adds to the mapping of the earlier run
+    with open(Common.MAPPING_ITEMS_FILE_PATH, 'a' if schedule.completed else 'w', encoding='utf-8') as mapping_file:
         for project_id in project_ids:
+            if not schedule.proceed():
+                return
             mapped_project_id = project_mapping.get(project_id)
-            insert_items(project_id, github,
-                         os.path.join(Common.FOLDER_ITEM_PATH, f"{project_id}.json"),
-                         mapped_project_id,
-                         mapping_file)
-
-def count_content_occurrences(data):
-    '''Count content occurrences'''
-    if isinstance(data, dict):
-        return sum(count_content_occurrences(v) for v in data.values()) + ('content' in data)
-    if isinstance(data, list):
-        return sum(count_content_occurrences(i) for i in data)
-    return 0
+            if incremental and imported.unchanged(manifest, project_id, 'items', mapped_project_id):
+                logging.info('Insert Items Skipped (Export unchanged) - Project ID: %s, Mapped Project ID: %s',
+                             project_id, mapped_project_id)
+            else:
+                if insert_items(project_id, github,
+                                os.path.join(Common.FOLDER_ITEM_PATH, f"{project_id}.json"),
+                                mapped_project_id,
+                                mapping_file):
+                    imported.record(manifest, project_id, 'items', mapped_project_id)
+            mapping_file.flush()
+            schedule.done(project_id)
+            progress.finish_project(project_id)
 
 def insert_items(project_id, github, file_path, mapped_project_id, mapping_file):
-    '''Insert items'''
+    '''Insert items, returns False if the project failed, failed items are in the dead-letter file'''
     try:
         project_data = load_project_data(file_path)
         if not project_data:
-            return
-
-        count = count_content_occurrences(project_data)
-        logging.info('Insert Items Start - Project ID: %s, Mapped Project ID: %s, Number of Items: %s',
-                     project_id, mapped_project_id, count)
-
-        # get current project info
-        mapped_project_fields_info, mapped_project_draft_issue = github.get_single_project_for_import(mapped_project_id)
-
-        succeed_or_skip = 0
-        fail = 0
-        for project in project_data:
-            for item in project:
-                if 'content' in item:
-                    try:
-                        process_item(item, github, mapped_project_id, mapped_project_fields_info, mapped_project_draft_issue, mapping_file)
-                        succeed_or_skip = succeed_or_skip + 1
-                    except Exception as item_error:
-                        logging.error('Insert Items Failed - %s: %s', project_id, str(item_error))
-                        fail = fail + 1
+            return True
 
-        logging.info('Insert Items Completed - Project ID: %s, Mapped Project ID: %s, Number of Items: %s, Succeed or Skip: %s, Fail: %s', 
-                     project_id, mapped_project_id, count, succeed_or_skip, fail)
+        with profiler.phase('resolve'):
+            if is_columnar(project_data):
+                items = decode_items(project_data)
+            else:
+                items = [item for page in project_data for item in parse_items(page)]
+        insert_item_pages(project_id, github, [items], mapped_project_id, mapping_file, len(items))
+        return True
 
     except FileNotFoundError as fnf_error:
         logging.error('File not found - %s %s', file_path, str(fnf_error))
     except Exception as general_error:
         logging.error('Insert Items Failed - %s: %s', project_id, str(general_error))
+    return False
+
+def insert_item_pages(project_id, github, pages, mapped_project_id, mapping_file, count):
+    '''Insert items from pages of parsed project items, pages can be a stream'''
+    logging.info('Insert Items Start - Project ID: %s, Mapped Project ID: %s, Number of Items: %s',
+                 project_id, mapped_project_id, count)
+
+    # get current project info
+    mapped_project_fields_info, mapped_project_draft_issue = github.get_single_project_for_import(mapped_project_id)
+
+    progress.start_project(project_id, count)
+    draft_titles = target_draft_titles(mapped_project_draft_issue)
+    pending_drafts = []
+    succeed_or_skip = 0
+    fail = 0
+    # issue/PR items are sent one request at a time each, several items keep the concurrency limits busy
+    workers = github.session.workers()
+    running = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for items in pages:
+            for item in items:
+                if item.content_type == ProjectV2Item.DRAFT_ISSUE:
+                    if is_draft_inserted(item, draft_titles):
+                        logging.info('Insert Draft Issue Skipped - Project ID: %s, Content ID: %s, Title: %s',
+                                     mapped_project_id, item.content_id, item.title)
+                        succeed_or_skip = succeed_or_skip + 1
+                        progress.advance(project_id)
+                    else:
+                        pending_drafts.append(item)
+                    if len(pending_drafts) >= github.BATCH_SIZE:
+                        succeed, failed = insert_draft_batch(github, mapped_project_id, pending_drafts, mapped_project_fields_info, project_id)
+                        succeed_or_skip = succeed_or_skip + succeed
+                        fail = fail + failed
+                        progress.advance(project_id, len(pending_drafts))
+                        pending_drafts = []
+                    continue
+
+                if len(running) >= workers * 2:
+                    # keeps the queued items of a streamed project bounded
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    succeed = sum(future.result() for future in done)
+                    succeed_or_skip = succeed_or_skip + succeed
+                    fail = fail + len(done) - succeed
+                running.add(executor.submit(insert_item, item, github, mapped_project_id, mapped_project_fields_info,
+                                            mapping_file, project_id))
+
+        succeed = sum(future.result() for future in running)
+        succeed_or_skip = succeed_or_skip + succeed
+        fail = fail + len(running) - succeed
+
+    if pending_drafts:
+        succeed, failed = insert_draft_batch(github, mapped_project_id, pending_drafts, mapped_project_fields_info, project_id)
+        succeed_or_skip = succeed_or_skip + succeed
+        fail = fail + failed
+        progress.advance(project_id, len(pending_drafts))
+
+    logging.info('Insert Items Completed - Project ID: %s, Mapped Project ID: %s, Number of Items: %s, Succeed or Skip: %s, Fail: %s', 
+                 project_id, mapped_project_id, count, succeed_or_skip, fail)
+
+def target_draft_titles(drafts):
+    '''Get titles of the draft issues in the target project'''
+    return {draft.title for draft in drafts}
+
+def is_draft_inserted(item, draft_titles):
+    '''Check if a draft item is already in the target project, drafts are matched by title'''
+    return item.title in draft_titles
+
+def insert_item(item, github, mapped_project_id, mapped_project_fields_info, mapping_file, project_id):
+    '''Insert an issue/PR item, returns False if failed'''
+    try:
+        process_item(item, github, mapped_project_id, mapped_project_fields_info, mapping_file, project_id)
+        return True
+    except Exception as item_error:
+        logging.error('Insert Items Failed - %s: %s', project_id, str(item_error))
+        if item.content_type is not None:
+            dead_letters.record(ITEM, project_id, mapped_project_id, item_node(item), item_error)
+        return False
+    finally:
+        progress.advance(project_id)
+
+def insert_draft_batch(github, mapped_project_id, drafts, mapped_project_fields_info, project_id=None):
+    '''Insert a batch of draft issues, a failed batch counts as failed and the project continues'''
+    try:
+        return insert_draft_issues(github, mapped_project_id, drafts, mapped_project_fields_info, project_id)
+    except Exception as batch_error:
+        logging.error('Insert Draft Issues Failed - Project ID: %s, Drafts: %s: %s',
+                      mapped_project_id, len(drafts), str(batch_error))
+        for draft in drafts:
+            dead_letters.record(DRAFT, project_id, mapped_project_id, item_node(draft), batch_error)
+        return 0, len(drafts)
 
 def load_project_data(file_path):
     '''Load project data'''
-    with open(file_path, 'r', encoding='utf-8') as file:
-        project_data = json.load(file)
-        logging.debug('Loaded project data from %s', file_path)
-        if not project_data or not isinstance(project_data, list) or not project_data[0] or not isinstance(project_data[0], list) or not project_data[0][0]:
-            logging.warning('No data found or Invalid project data in %s', file_path)
+    project_data = Common.read_json_from_file(file_path)
+    logging.debug('Loaded project data from %s', file_path)
+    if is_columnar(project_data):
+        if not project_data['count']:
+            logging.warning('No data found in %s', file_path)
             return None
         return project_data
-
-def process_item(item, github, mapped_project_id, mapped_project_fields_info, mapped_project_draft_issue, mapping_file):
-    '''Process item'''
-    content_type, content_id, content_title, content_number, repository_name = get_content_from_file(item)
-
-    if content_type == "DI":
-        process_draft_issue(item, content_title, mapped_project_id, content_id, mapped_project_draft_issue, github, content_number, mapped_project_fields_info)
+    if not project_data or not isinstance(project_data, list) or not project_data[0] or not isinstance(project_data[0], list) or not project_data[0][0]:
+        logging.warning('No data found or Invalid project data in %s', file_path)
+        return None
+    return project_data
+
+def process_item(item, github, mapped_project_id, mapped_project_fields_info, mapping_file, project_id=None):
+    '''Process issue or PR item, draft issues are inserted in batches'''
+    if item.content_type == ProjectV2Item.ISSUE:
+        process_issue_or_pr(item, github, mapped_project_id, mapped_project_fields_info, mapping_file, project_id)
     else:
-        process_issue_or_pr(item, github, mapped_project_id, content_id, content_title, content_number, repository_name, mapped_project_fields_info, mapping_file)
-
-def process_draft_issue(item, title, mapped_project_id, content_id, mapped_project_draft_issue, github, body, mapped_project_fields_info):
-    '''Process draft issue'''
+        raise ValueError(f"Item has no content: {item.id}")
 
-    logging.info('Insert Draft Issue - Project ID: %s, Content ID: %s, Title: %s', mapped_project_id, content_id, title)
-    draft_exists = any(title in item['title'] for item in mapped_project_draft_issue)
-    if draft_exists:
-        logging.info('Insert Draft Issue Skipped - Project ID: %s, Content ID: %s, Title: %s', mapped_project_id, content_id, title)
-    else:
-        draft_id = github.add_draft_issue(mapped_project_id, title, body)
-        logging.info('Insert Draft Issue Succeeded - Project ID: %s, Content ID: %s, Title: %s', mapped_project_id, content_id, title)
-        field_values_list = get_values_from_file(item)
-        set_field_values(github, mapped_project_id, draft_id, field_values_list, mapped_project_fields_info)
-
-def process_issue_or_pr(item, github, mapped_project_id, content_id, content_title, content_number, repository_name, mapped_project_fields_info, mapping_file):
+def process_issue_or_pr(item, github, mapped_project_id, mapped_project_fields_info, mapping_file, project_id=None):
     '''Process issue or PR'''
-    field_values_list = get_values_from_file(item)
-    logging.info('Insert Items - Project ID: %s, Content ID: %s, Number: %s, Repository: %s, Fields Count: %s, Content Title: %s',
-                 mapped_project_id, content_id, content_number, repository_name, len(field_values_list), content_title)
+    logging.debug('Insert Items - Project ID: %s, Content ID: %s, Number: %s, Repository: %s, Fields Count: %s, Content Title: %s',
+                  mapped_project_id, item.content_id, item.number, item.repository, len(item.field_values), item.title)
 
-    github_content = github.get_content(repository_name, content_number)
+    github_content = github.get_content(item.repository, item.number)
     target_content_id = github_content['id']
 
     project_item = github.add_project_item(mapped_project_id, target_content_id)
-    mapping_file.write(f"{repository_name},{content_number},{content_id} -> {target_content_id}\n")
-    logging.info('Insert Items Succeeded - Project ID: %s, Content ID: %s, Number: %s, Repository: %s, Content Title: %s',
-                 mapped_project_id, target_content_id, content_number, repository_name, content_title)
+    with MAPPING_LOCK:
+        mapping_file.write(f"{item.repository},{item.number},{item.content_id} -> {target_content_id}\n")
 
-    set_field_values(github, mapped_project_id, project_item['id'], field_values_list, mapped_project_fields_info)
+    field_ids = set_field_values(github, mapped_project_id, project_item['id'], item.field_values, mapped_project_fields_info,
+                                 project_id)
+    logging.info('Insert Items Succeeded - Project ID: %s, Content ID: %s, Number: %s, Repository: %s, Content Title: %s, Fields Updated: %s',
+                 mapped_project_id, target_content_id, item.number, item.repository, item.title, len(field_ids))
 
 def find_field_id_by_name(field, mapped_project_fields_info):
     '''Find field id by name'''
-    field_name = field['field_name']
-    field_value = field['value']
+    field_name = field.field
+    field_value = field.value
 
     for mapped_field in mapped_project_fields_info:
         if mapped_field.name == field_name:
@@ -270,123 +456,225 @@ def find_value_id_in_iterations(configuration, field_value):
                 return value['id']
     return None
 
-def set_field_values(github, mapped_project_id, item_id, field_values_list, mapped_project_fields_info):
+# field value typename -> value_type of GitHub.set_item_field_value
+UPDATE_VALUE_TYPES = {
+    'ProjectV2ItemFieldTextValue': 'text',
+    'ProjectV2ItemFieldNumberValue': 'number',
+    'ProjectV2ItemFieldSingleSelectValue': 'selection',
+    'ProjectV2ItemFieldDateValue': 'date',
+    'ProjectV2ItemFieldIterationValue': 'iteration'
+}
+
+def resolve_field_value(field, mapped_project_fields_info):
+    '''Resolve target field id, value and value type of a field value, None if skipped'''
+    field_name = field.field
+    if field_name == 'Title': # skip Title field
+        return None
+    if field.value is None:
+        logging.warning("Value is not found for field %s", field_name)
+        return None
+
+    # map field ids
+    with profiler.phase('resolve'):
+        field_id, field_mapped_value_id = find_field_id_by_name(field, mapped_project_fields_info)
+    value_type = UPDATE_VALUE_TYPES.get(field.typename)
+    if field_id is None or value_type is None:
+        return None
+
+    logging.debug('Update Field Value: %s, %s, target field id %s, mapped id %s',
+                  field_name,
+                  field.value,
+                  field_id,
+                  field_mapped_value_id)
+
+    if value_type in ('selection', 'iteration'):
+        # a null option id fails the whole batched mutation, find_field_id_by_name warned about it
+        if field_mapped_value_id is None:
+            return None
+        return field_id, field_mapped_value_id, value_type
+    return field_id, field.value, value_type
+
+def set_field_values(github, mapped_project_id, item_id, field_values, mapped_project_fields_info, project_id=None):
     '''Set field values'''
+    field_ids = []
     try:
-        field_ids = []
-        for field in field_values_list:
+        for field in field_values:
             try:
-                field_name = field['field_name']
-                if field_name == 'Title': # skip Title field
-                    continue
-                logging.info('Update Field Value: %s, %s', field_name, field['value'])
-
-                # map field ids
-                field_id, field_mapped_value_id = find_field_id_by_name(field, mapped_project_fields_info)
-                if field_id is None:
+                field_name = field.field
+                resolved = resolve_field_value(field, mapped_project_fields_info)
+                if resolved is None:
                     continue
 
-                logging.info('Update Field Value: %s, %s, target field id %s, mapped id %s',
-                             field_name,
-                             field['value'],
-                             field_id,
-                             field_mapped_value_id)
-
-                typename = field['typename']
-                field_value = field['value']
-                if typename == 'ProjectV2ItemFieldTextValue':
-                    logging.debug('Updating Field Value (Text): %s, %s', field_name, field_value)
-                    github.set_item_field_value_text(mapped_project_id, item_id, field_id, field_value)
-                    logging.info('Update Field Value Succeeded (Text) - %s, %s', field_name, field_value)
-                elif typename == 'ProjectV2ItemFieldNumberValue':
-                    logging.debug('Updating Field Value (Number): %s, %s', field_name, field_value)
-                    github.set_item_field_value_number(mapped_project_id, item_id, field_id, field_value)
-                    logging.info('Update Field Value Succeeded (Number) - %s, %s', field_name, field_value)
-                elif typename == 'ProjectV2ItemFieldSingleSelectValue':
-                    logging.debug('Updating Field Value (SingleSelect): %s, %s', field_name, field_mapped_value_id)
-                    github.set_item_field_value_selection(mapped_project_id, item_id, field_id, field_mapped_value_id)
-                    logging.info('Update Field Value Succeeded (SingleSelect) - %s, %s', field_name, field_mapped_value_id)
-                elif typename == 'ProjectV2ItemFieldDateValue':
-                    logging.debug('Updating Field Value (Date): %s, %s', field_name, field_value)
-                    github.set_item_field_value_date(mapped_project_id, item_id, field_id, field_value)
-                    logging.info('Update Field Value Succeeded (Date) - %s, %s', field_name, field_value)
-                elif typename == 'ProjectV2ItemFieldIterationValue':
-                    logging.debug('Updating Field Value (Iteration): %s, %s', field_name, field_mapped_value_id)
-                    github.set_item_field_value_iteration(mapped_project_id, item_id, field_id, field_mapped_value_id)
-                    logging.info('Update Field Value Succeeded (Iteration) - %s, %s', field_name, field_mapped_value_id)
+                field_id, value, value_type = resolved
+                github.set_item_field_value(mapped_project_id, item_id, field_id, value, value_type)
+                logging.debug('Update Field Value Succeeded (%s) - %s, %s', value_type, field_name, value)
                 field_ids.append(field_id)
             except Exception as field_error:
                 logging.error('Update Field Value Failed - %s, field name %s: %s', item_id, field_name, str(field_error))
+                dead_letters.record(FIELD_VALUE, project_id, mapped_project_id,
+                                    {'item_id': item_id, 'value': value_node(field)}, field_error)
 
     except Exception as general_error:
         logging.error('Update Field Value Failed - %s: %s', item_id, str(general_error))
     return field_ids
 
-def get_content_from_file(item):
-    '''Get content from file'''
-    if 'content' in item:
-        contents = item['content']
-        content_id = contents['id']
-        is_draft = not 'repository' in contents.keys()
-
-        content_title = contents.get('title', '')
-        content_body = contents.get('body', '') if is_draft else None
-        content_number = contents.get('number') if not is_draft else None
-        repository_name = contents['repository']['name'] if not is_draft else None
-
-        return ("DI", content_id, content_title, content_body, '') if is_draft else ("I", content_id, content_title, content_number, repository_name)
-
-    return (None, None, None, None, None)
+def set_field_value_batch(github, mapped_project_id, updates):
+    '''Set field values with batched mutations, returns error per update, every update of a raising batch is failed'''
+    if not updates:
+        return []
+    try:
+        return github.set_item_field_values(mapped_project_id, updates)
+    except Exception as batch_error:
+        return [batch_error] * len(updates)
 
-def get_values_from_file(item):
-    ''' Get values from file'''
-    if 'fieldValues' in item:
-        field_values = item['fieldValues']['nodes']
-        field_values_list = []
-        for field in field_values:
-            if len(field) == 1 and '__typename' in field:
-                continue  # Skip nodes that only contain __typename
-            typename = field.get('__typename')
-            value = None
-            if typename == "ProjectV2ItemFieldTextValue":
-                value = field.get('text')
-            elif typename == "ProjectV2ItemFieldSingleSelectValue":
-                value = field.get('name')
-            elif typename == "ProjectV2ItemFieldIterationValue":
-                value = field.get('title')
-            elif typename == "ProjectV2ItemFieldNumberValue":
-                value = field.get('number')
-            elif typename == "ProjectV2ItemFieldDateValue":
-                value = field.get('date')
-            field_name = field.get('field', {}).get('name')
-
-            # warning
-            if value is None:
-                logging.warning("Value is not found for field %s", field_name)
-
-            field_values_list.append({
-                    'typename': typename,
-                    'value': value,
-                    'field_name': field_name
-                })
-
-        return field_values_list
-    return []
+def insert_draft_issues(github, mapped_project_id, drafts, mapped_project_fields_info, project_id=None):
+    '''Insert draft issues and their field values with batched mutations, returns (succeed, fail)'''
+    try:
+        results = github.add_draft_issues(mapped_project_id, [(draft.title, draft.body) for draft in drafts])
+    except Exception as batch_error:
+        # every draft of a raising batch is failed
+        results = [(None, batch_error)] * len(drafts)
+
+    # field values of all created drafts go into follow-up batches
+    created = []
+    updates = []
+    owners = []
+    fail = 0
+    for draft, (draft_id, error) in zip(drafts, results):
+        if error:
+            logging.error('Insert Draft Issue Failed - Project ID: %s, Content ID: %s, Title: %s: %s',
+                          mapped_project_id, draft.content_id, draft.title, error)
+            dead_letters.record(DRAFT, project_id, mapped_project_id, item_node(draft), error)
+            fail = fail + 1
+            continue
+        created.append((draft, draft_id))
+        for field in draft.field_values:
+            try:
+                resolved = resolve_field_value(field, mapped_project_fields_info)
+            except Exception as field_error:
+                logging.error('Update Field Value Failed - %s, field name %s: %s', draft_id, field.field, str(field_error))
+                dead_letters.record(FIELD_VALUE, project_id, mapped_project_id,
+                                    {'item_id': draft_id, 'value': value_node(field)}, field_error)
+                continue
+            if resolved is not None:
+                field_id, value, value_type = resolved
+                updates.append((draft_id, field_id, value, value_type))
+                owners.append(field)
+
+    errors = set_field_value_batch(github, mapped_project_id, updates)
+    updated = {}
+    for (draft_id, _, _, _), field, error in zip(updates, owners, errors):
+        if error:
+            logging.error('Update Field Value Failed - %s, field name %s: %s', draft_id, field.field, error)
+            dead_letters.record(FIELD_VALUE, project_id, mapped_project_id,
+                                {'item_id': draft_id, 'value': value_node(field)}, error)
+        else:
+            updated[draft_id] = updated.get(draft_id, 0) + 1
+
+    for draft, draft_id in created:
+        logging.info('Insert Draft Issue Succeeded - Project ID: %s, Content ID: %s, Title: %s, Item ID: %s, Fields Updated: %s',
+                     mapped_project_id, draft.content_id, draft.title, draft_id, updated.get(draft_id, 0))
+    return len(created), fail
+
+def retry_failed(organization, auth_token):
+    '''Replay the failed units of earlier runs, units failing again are recorded again'''
+    github = GitHub(organization, auth_token)
+    entries = dead_letters.take()
+    # unit -> (project_id, mapped_project_id) -> inputs
+    groups = {unit: {} for unit in UNITS}
+    for entry in entries:
+        if entry['unit'] in groups:
+            groups[entry['unit']].setdefault((entry['project_id'], entry['mapped_project_id']), []).append(entry['input'])
+    logging.info('Retry Failed Started - Units: %s', len(entries))
+
+    progress.start('retry failed', sum(len(projects) for projects in groups.values()))
+    with open(Common.MAPPING_ITEMS_FILE_PATH, 'a', encoding='utf-8') as mapping_file:
+        for unit in UNITS:
+            for (project_id, mapped_project_id), inputs in groups[unit].items():
+                try:
+                    if unit == FIELD:
+                        # fields created in the meantime are skipped by name
+                        create_fields_from_data(project_id, github, [inputs], mapped_project_id)
+                    elif unit in (ITEM, DRAFT):
+                        # draft titles inserted in the meantime are skipped
+                        items = [ProjectV2Item.from_node(node) for node in inputs]
+                        insert_item_pages(project_id, github, [items], mapped_project_id, mapping_file, len(items))
+                    else:
+                        retry_field_values(project_id, github, mapped_project_id, inputs)
+                except Exception as general_error:
+                    logging.error('Retry Failed Units Failed - %s %s: %s', unit, project_id, str(general_error))
+                    for data in inputs:
+                        dead_letters.record(unit, project_id, mapped_project_id, data, general_error)
+                mapping_file.flush()
+                progress.finish_project(project_id)
+
+def retry_field_values(project_id, github, mapped_project_id, inputs):
+    '''Set failed field values with batched mutations'''
+    mapped_project_fields_info, _ = github.get_single_project_for_import(mapped_project_id)
+    updates = []
+    owners = []
+    for data in inputs:
+        field = parse_field_value(data['value'])
+        if field is None:
+            logging.error('Update Field Value Failed - %s, field type %s is not supported',
+                          data['item_id'], data['value'].get('__typename'))
+            dead_letters.record(FIELD_VALUE, project_id, mapped_project_id, data,
+                                f"Unsupported field value type: {data['value'].get('__typename')}")
+            continue
+        resolved = resolve_field_value(field, mapped_project_fields_info)
+        if resolved is None:
+            logging.warning('Update Field Value Skipped - %s, field name %s', data['item_id'], field.field)
+            continue
+        field_id, value, value_type = resolved
+        updates.append((data['item_id'], field_id, value, value_type))
+        owners.append(data)
+
+    errors = set_field_value_batch(github, mapped_project_id, updates)
+    fail = 0
+    for data, error in zip(owners, errors):
+        if error:
+            logging.error('Update Field Value Failed - %s, field name %s: %s',
+                          data['item_id'], data['value']['field']['name'], error)
+            dead_letters.record(FIELD_VALUE, project_id, mapped_project_id, data, error)
+            fail = fail + 1
+    logging.info('Retry Field Values Completed - Mapped Project ID: %s, Updated: %s, Fail: %s',
+                 mapped_project_id, len(updates) - fail, fail)
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        level = logging.INFO,
-        format = "%(asctime)s [%(levelname)s] %(message)s",
-        handlers = [
-            logging.FileHandler("import.log"),
-            logging.StreamHandler()
-        ])
-
     parser = argparse.ArgumentParser(description='Import GitHub project')
     parser.add_argument('-o', '--operation',
                         choices=['projects', 'fields', 'items'],
                         help='Operation to perform (projects, fields, items)')
+    parser.add_argument('--archive', metavar='FILE',
+                        help='Read the exported datasets from an archive written by export.py --archive')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help=f'Replay only the failed units recorded in {Common.DEAD_LETTER_FILE_PATH} instead of an operation')
+    parser.add_argument('--time-budget', type=int, metavar='SECONDS',
+                        help='Stop starting new projects after this many seconds')
+    parser.add_argument('--point-budget', type=int, metavar='POINTS',
+                        help='Stop starting new projects after this many rate-limit points are used')
+    parser.add_argument('--priority', choices=PRIORITIES, default=LISTED,
+                        help='Project order: listed, explicit (--projects), largest or smallest first')
+    parser.add_argument('--projects', default='',
+                        help='Comma-separated project IDs to import in this order (with --priority explicit)')
+    parser.add_argument('--resume', action='store_true',
+                        help=f'Skip projects completed by the last run of the operation, kept in {Common.RUN_STATE_FILE_PATH}')
+    parser.add_argument('--incremental', action='store_true',
+                        help=f'Skip projects imported from the same export before, by the checksums in {Common.MANIFEST_FILE_PATH} (fields, items)')
+    parser.add_argument('--use-templates', action='store_true',
+                        help='Create projects with identical fields as copies of one template project (projects)')
+    add_common_arguments(parser)
     args = parser.parse_args()
+    if args.priority == EXPLICIT and not any(args.projects.split(',')):
+        parser.error('--priority explicit requires --projects')
+
+    apply_common_arguments(args, "import.log")
+
+    if args.archive:
+        Common.ARCHIVE = ProjectArchive(args.archive)
+    if not args.replay:
+        GitHubSession.journal = IntentJournal(Common.INTENT_FILE_PATH)
+    dead_letters.enable(Common.DEAD_LETTER_FILE_PATH)
 
     org = os.environ['GITHUB_ORG_TARGET']
     token = os.environ['GITHUB_TOKEN_TARGET']
@@ -396,12 +684,22 @@ if __name__ == '__main__':
     if not token:
         raise KeyError("The 'GITHUB_TOKEN_TARGET' environment variable is missing.")
 
-    if args.operation == 'projects':
-        import_github_project(org, token)
+    run_schedule = RunSchedule(f'import {args.operation}', args.time_budget, args.point_budget, args.priority,
+                               [project_id for project_id in args.projects.split(',') if project_id],
+                               Common.RUN_STATE_FILE_PATH, args.resume)
+
+    if args.retry_failed:
+        retry_failed(org, token)
+    elif args.operation == 'projects':
+        import_github_project(org, token, args.use_templates, run_schedule)
     elif args.operation == 'fields':
-        import_github_project_fields(org, token)
+        import_github_project_fields(org, token, run_schedule, args.incremental)
     elif args.operation == 'items':
-        import_github_project_items(org, token)
+        import_github_project_items(org, token, run_schedule, args.incremental)
     else:
         print ('usage: import.py [-h] [-o {projects, fields, items}]')
+
+    dead_letters.close()
+    progress.report(force=True)
+    profiler.write('import')
                          
\ No newline at end of file
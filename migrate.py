@@ -0,0 +1,143 @@
+'''Migrate GitHub project directly from source to target organization'''
+import argparse
+import logging
+import os
+import queue
+import threading
+from util.github import GitHub, Project, parse_items
+from util.comon import Common
+from util.cli import add_common_arguments, apply_common_arguments
+from util.githubsession import GitHubSession
+from util.idempotency import IntentJournal
+from util.importer import importer
+
+PAGE_QUEUE_SIZE = 10
+# seconds between checks of the stop event while the queue is full
+PUT_TIMEOUT = 1
+
+def create_directories():
+    '''Create necessary directories for tee'''
+    os.makedirs(Common.FOLDER_PATH, exist_ok=True)
+    os.makedirs(Common.FOLDER_FIELDS_PATH, exist_ok=True)
+    os.makedirs(Common.FOLDER_ITEM_PATH, exist_ok=True)
+
+def put_page(pages, nodes, stop):
+    '''Put into the queue, False if the consumer stopped'''
+    while not stop.is_set():
+        try:
+            pages.put(nodes, timeout=PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def produce_item_pages(github, project, pages, stop):
+    '''Fetch item pages from source project and put them into the queue until the consumer stops'''
+    try:
+        for nodes in project.iter_items(github):
+            if not put_page(pages, nodes, stop):
+                return
+    except Exception as error:
+        put_page(pages, error, stop)
+    finally:
+        put_page(pages, None, stop)
+
+def consume_item_pages(pages, tee_items):
+    '''Get item pages from the queue until the producer is done'''
+    while True:
+        nodes = pages.get()
+        if nodes is None:
+            return
+        if isinstance(nodes, Exception):
+            raise nodes
+        if tee_items is not None:
+            tee_items.append(nodes)
+        yield parse_items(nodes)
+
+def migrate_project(source, target, owner_id, project_meta, mapping_file, items_mapping_file, tee):
+    '''Migrate a single project'''
+    project_id = project_meta['id']
+    try:
+        logging.info('Migrate Project - %s', project_id)
+
+        # project create & update
+        target_project_id = target.create_project(project_meta, owner_id)
+        target.update_project(target_project_id, project_meta)
+        mapping_file.write(f"{project_id} -> {target_project_id}\n")
+        mapping_file.flush()
+        logging.info('Create Project Succeeded - Id:%s Title:%s', target_project_id, project_meta['title'])
+
+        # fields
+        project = Project(project_id=project_id)
+        project.fetch_fields(source)
+        importer.create_fields_from_data(project_id, target, project.fields, target_project_id)
+
+        # items are imported while the remaining pages are still being fetched
+        count = source.get_project_items_count(project_id)
+        pages = queue.Queue(maxsize=PAGE_QUEUE_SIZE)
+        stop = threading.Event()
+        producer = threading.Thread(target=produce_item_pages, args=(source, project, pages, stop), daemon=True)
+        producer.start()
+        tee_items = [] if tee else None
+        try:
+            importer.insert_item_pages(project_id, target, consume_item_pages(pages, tee_items),
+                                       target_project_id, items_mapping_file, count)
+        finally:
+            # a failed consumer leaves the queue full, the producer stops instead of blocking
+            stop.set()
+            producer.join()
+
+        if tee:
+            Common.write_json_to_file(os.path.join(Common.FOLDER_PATH, f"{project_id}.json"), project_meta)
+            Common.write_json_to_file(os.path.join(Common.FOLDER_FIELDS_PATH, f"{project_id}.json"), project.fields)
+            Common.write_json_to_file(os.path.join(Common.FOLDER_ITEM_PATH, f"{project_id}.json"), tee_items)
+
+        logging.info('Migrate Project Completed - %s -> %s', project_id, target_project_id)
+
+    except Exception as general_error:
+        logging.error('Migrate Project Failed - %s: %s', project_id, str(general_error))
+
+def migrate_github_projects(organization, auth_token, organization_target, auth_token_target, tee):
+    '''Migrate GitHub projects'''
+    source = GitHub(organization, auth_token)
+    target = GitHub(organization_target, auth_token_target)
+    owner_id = target.get_ownerid()
+    projects = source.get_projects()
+
+    if tee:
+        create_directories()
+
+    with open(Common.MAPPING_FILE_PATH, 'w', encoding='utf-8') as mapping_file, \
+        open(Common.MAPPING_ITEMS_FILE_PATH, 'w', encoding='utf-8') as items_mapping_file:
+        for project in projects:
+            migrate_project(source, target, owner_id, project.project_meta,
+                            mapping_file, items_mapping_file, tee)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migrate GitHub project from source to target organization')
+    parser.add_argument('--tee', action='store_true',
+                        help='Also write exported data to the projects folders for audit')
+    parser.add_argument('--pretty', action='store_true',
+                        help='Write indented JSON files instead of compact ones')
+    add_common_arguments(parser, requests=False, status=False, profile=False)
+    args = parser.parse_args()
+
+    Common.PRETTY_JSON = args.pretty
+    apply_common_arguments(args, "migrate.log")
+    GitHubSession.journal = IntentJournal(Common.INTENT_FILE_PATH)
+
+    org = os.environ['GITHUB_ORG']
+    token = os.environ['GITHUB_TOKEN']
+    org_target = os.environ['GITHUB_ORG_TARGET']
+    token_target = os.environ['GITHUB_TOKEN_TARGET']
+
+    if not org:
+        raise KeyError("The 'GITHUB_ORG' environment variable is missing.")
+    if not token:
+        raise KeyError("The 'GITHUB_TOKEN' environment variable is missing.")
+    if not org_target:
+        raise KeyError("The 'GITHUB_ORG_TARGET' environment variable is missing.")
+    if not token_target:
+        raise KeyError("The 'GITHUB_TOKEN_TARGET' environment variable is missing.")
+
+    migrate_github_projects(org, token, org_target, token_target, args.tee)
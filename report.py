@@ -0,0 +1,117 @@
+'''Report counts of exported project items without API calls'''
+import argparse
+import collections
+import csv
+import os
+import sys
+from util.archive import ProjectArchive
+from util.columnar import decode_values, encode_items, is_columnar
+from util.comon import Common
+from util.github import ProjectV2Item, parse_items
+
+# columns that are not project fields
+PROJECT_COLUMN = 'project'
+TYPE_COLUMN = 'type'
+REPOSITORY_COLUMN = 'repository'
+CONTENT_TYPES = {ProjectV2Item.ISSUE: 'issue', ProjectV2Item.DRAFT_ISSUE: 'draft'}
+
+def load_columns(project_id):
+    '''Load items of a project in columnar form'''
+    data = Common.read_json_from_file(os.path.join(Common.FOLDER_ITEM_PATH, f"{project_id}.json"))
+    if is_columnar(data):
+        return data
+    return encode_items([item for page in data or [] for item in parse_items(page)])
+
+def column_values(project_id, data, name):
+    '''Get values of a column, None where the item has no value'''
+    count = data['count']
+    if name == PROJECT_COLUMN:
+        return [project_id] * count
+    if name == TYPE_COLUMN:
+        return [CONTENT_TYPES.get(value, value) for value in decode_values(data['content_types'], data['content_type'])]
+    if name == REPOSITORY_COLUMN:
+        return decode_values(data['repositories'], data['repository'])
+
+    # a field name can have values of several types
+    values = [None] * count
+    for field in data['fields']:
+        if field['name'] != name:
+            continue
+        column = field['values']
+        if 'dictionary' in field:
+            column = decode_values(field['dictionary'], column)
+        values = [value if value is not None else other for value, other in zip(values, column)]
+    return values
+
+def parse_condition(condition):
+    '''Parse NAME=VALUE or NAME!=VALUE, an empty VALUE matches items without a value'''
+    negate = '!=' in condition
+    name, _, value = condition.partition('!=' if negate else '=')
+    if not name or name == condition:
+        raise ValueError(f"Invalid condition: {condition}")
+    return name, value, negate
+
+def matches(value, expected, negate):
+    '''Check if a value satisfies a condition'''
+    if value is None:
+        equal = expected == ''
+    else:
+        equal = str(value) == expected
+    return equal != negate
+
+def count_items(project_ids, group_by, conditions):
+    '''Count items by the group-by columns across projects, returns Counter of value tuples'''
+    counts = collections.Counter()
+    for project_id in project_ids:
+        data = load_columns(project_id)
+        if not data['count']:
+            continue
+        selected = range(data['count'])
+        for name, expected, negate in conditions:
+            values = column_values(project_id, data, name)
+            selected = [row for row in selected if matches(values[row], expected, negate)]
+        columns = [column_values(project_id, data, name) for name in group_by]
+        counts.update(tuple(column[row] for column in columns) for row in selected)
+    return counts
+
+def write_report(counts, group_by, output_format, file):
+    '''Write counts sorted by count descending'''
+    rows = [list(key) + [count] for key, count in sorted(counts.items(), key=lambda entry: (-entry[1], str(entry[0])))]
+    header = list(group_by) + ['count']
+    if output_format == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+    elif output_format == 'json':
+        file.write(Common.json_dumps([dict(zip(header, row)) for row in rows], pretty=True) + '\n')
+    else:
+        cells = [header] + [['' if value is None else str(value) for value in row] for row in rows]
+        widths = [max(len(row[index]) for row in cells) for index in range(len(header))]
+        for row in cells:
+            file.write('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() + '\n')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report counts of exported project items')
+    parser.add_argument('-g', '--group-by', action='append', default=[],
+                        help=f'Column to group by, a field name or {PROJECT_COLUMN}, {TYPE_COLUMN}, {REPOSITORY_COLUMN} (repeatable)')
+    parser.add_argument('-w', '--where', action='append', default=[],
+                        help='Filter NAME=VALUE or NAME!=VALUE, an empty VALUE matches items without a value (repeatable)')
+    parser.add_argument('-p', '--project', action='append', default=[],
+                        help='Project ID to include, all exported projects by default (repeatable)')
+    parser.add_argument('--format', choices=['table', 'csv', 'json'], default='table',
+                        help='Output format')
+    parser.add_argument('--archive', metavar='FILE',
+                        help='Read the exported datasets from an archive written by export.py --archive')
+    args = parser.parse_args()
+
+    if args.archive:
+        Common.ARCHIVE = ProjectArchive(args.archive)
+
+    try:
+        report_conditions = [parse_condition(where) for where in args.where]
+    except ValueError as condition_error:
+        parser.error(str(condition_error))
+
+    report_project_ids = args.project or Common.project_id_list(Common.FOLDER_ITEM_PATH)
+    report_counts = count_items(report_project_ids, args.group_by, report_conditions)
+    write_report(report_counts, args.group_by, args.format, sys.stdout)
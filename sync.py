@@ -0,0 +1,204 @@
+'''Sync changes of GitHub projects from source to target organization'''
+import argparse
+import logging
+import os
+import time
+from util.github import GitHub, Project, ProjectV2Item, parse_items
+from util.columnar import read_items
+from util.comon import Common
+from util.cli import add_common_arguments, apply_common_arguments
+from util.githubsession import GitHubSession
+from util.idempotency import IntentJournal
+from util.importer import importer
+from util.progress import progress
+
+INTERVAL = 300
+BUDGET = 500
+
+def item_key(item):
+    '''Get key matching a source item with its target item'''
+    if item.content_type == ProjectV2Item.DRAFT_ISSUE:
+        return f"D:{item.title}"
+    return f"I:{item.repository}#{item.number}"
+
+def item_values(item):
+    '''Get field values of an item by field name'''
+    return {value.field: value.value for value in item.field_values}
+
+def read_state(file_path):
+    '''Read sync state, empty if missing'''
+    try:
+        return Common.read_json_from_file(file_path)
+    except FileNotFoundError:
+        return {}
+
+def write_state(file_path, state):
+    '''Write sync state atomically'''
+    Common.write_json_atomic(file_path, state)
+
+def exported_values(project_id):
+    '''Get field values of the exported items the import started from, None if not exported'''
+    try:
+        items = read_items(os.path.join(Common.FOLDER_ITEM_PATH, f"{project_id}.json"))
+    except FileNotFoundError:
+        return None
+    return {item_key(item): item_values(item) for item in items}
+
+def sync_project(project_id, source, target, mapped_project_id, project_state, budget, mapping_file):
+    '''Apply changes of a source project to its target project, returns (applied, deferred, failed) changes'''
+    # field values last synced, the export for the first cycle
+    synced = project_state.get('items')
+    if synced is None:
+        synced = exported_values(project_id) or {}
+
+    project = Project(project_id=project_id)
+    project.fetch_fields(source)
+    items = [item for nodes in project.iter_items(source) for item in parse_items(nodes)]
+    fields_info, target_items = target.get_single_project_for_import(mapped_project_id)
+    target_ids = {item_key(item): item.id for item in target_items}
+
+    applied = 0
+    deferred = 0
+    failed = 0
+    new_drafts = []
+    updates = []
+    owners = []
+    state_items = {}
+    for item in items:
+        key = item_key(item)
+        values = item_values(item)
+        previous = synced.get(key, {})
+        changed = [value for value in item.field_values if previous.get(value.field) != value.value]
+        if key in target_ids and not changed:
+            state_items[key] = values
+            continue
+        if applied >= budget:
+            # only items with pending changes are left for the next cycle
+            deferred = deferred + 1
+            if key in synced:
+                state_items[key] = synced[key]
+            continue
+
+        if key not in target_ids:
+            if item.content_type == ProjectV2Item.DRAFT_ISSUE:
+                new_drafts.append(item)
+            else:
+                try:
+                    importer.process_issue_or_pr(item, target, mapped_project_id, fields_info, mapping_file, project_id)
+                except Exception as item_error:
+                    logging.error('Sync Item Failed - %s %s: %s', project_id, key, str(item_error))
+                    failed = failed + 1
+                    continue
+            applied = applied + 1
+            state_items[key] = values
+            continue
+
+        resolve_failed = False
+        for value in changed:
+            try:
+                resolved = importer.resolve_field_value(value, fields_info)
+            except Exception as field_error:
+                logging.error('Update Field Value Failed - %s, field name %s: %s', key, value.field, str(field_error))
+                resolve_failed = True
+                continue
+            if resolved is not None:
+                field_id, field_value, value_type = resolved
+                updates.append((target_ids[key], field_id, field_value, value_type))
+                owners.append(key)
+        applied = applied + 1
+        if resolve_failed:
+            # no state, all values of the item are compared again next cycle
+            failed = failed + 1
+        else:
+            state_items[key] = values
+
+    if new_drafts:
+        _, draft_fail = importer.insert_draft_issues(target, mapped_project_id, new_drafts, fields_info, project_id)
+        failed = failed + draft_fail
+    errors = target.set_item_field_values(mapped_project_id, updates) if updates else []
+    for key, error in zip(owners, errors):
+        if error:
+            logging.error('Update Field Value Failed - %s: %s', key, error)
+            # retried next cycle, the project is synced again while it has failures
+            state_items.pop(key, None)
+            failed = failed + 1
+
+    project_state['items'] = state_items
+    logging.info('Sync Project Completed - Project ID: %s, Mapped Project ID: %s, Items: %s, New Drafts: %s, Field Updates: %s, Applied: %s, Deferred: %s, Failed: %s',
+                 project_id, mapped_project_id, len(items), len(new_drafts), len(updates), applied, deferred, failed)
+    return applied, deferred, failed
+
+def sync_cycle(source, target, project_mapping, state, budget, state_file):
+    '''Sync changed projects within the budget of changes'''
+    project_ids = list(project_mapping)
+    updated_at = source.get_projects_updated_at(project_ids)
+    changed = [project_id for project_id in project_ids
+               if project_id in updated_at and updated_at[project_id] != state.get(project_id, {}).get('updated_at')]
+    logging.info('Sync Cycle - Projects: %s, Changed: %s, Budget: %s', len(project_ids), len(changed), budget)
+
+    progress.start('sync', len(changed))
+    with open(Common.MAPPING_ITEMS_FILE_PATH, 'a', encoding='utf-8') as mapping_file:
+        for project_id in changed:
+            if budget <= 0:
+                break
+            project_state = state.setdefault(project_id, {})
+            try:
+                applied, deferred, failed = sync_project(project_id, source, target, project_mapping[project_id],
+                                                         project_state, budget, mapping_file)
+                budget = budget - applied
+                # deferred or failed changes keep the project changed for the next cycle
+                if not deferred and not failed:
+                    project_state['updated_at'] = updated_at[project_id]
+            except Exception as general_error:
+                logging.error('Sync Project Failed - %s: %s', project_id, str(general_error))
+            write_state(state_file, state)
+            progress.finish_project(project_id)
+
+def sync_github_projects(organization, auth_token, organization_target, auth_token_target,
+                         interval, budget, state_file, once):
+    '''Sync GitHub projects until interrupted'''
+    source = GitHub(organization, auth_token)
+    target = GitHub(organization_target, auth_token_target)
+    project_mapping = importer.read_project_mapping()
+    state = read_state(state_file)
+
+    while True:
+        started = time.time()
+        sync_cycle(source, target, project_mapping, state, budget, state_file)
+        progress.report(force=True)
+        if once:
+            break
+        time.sleep(max(interval - (time.time() - started), 0))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sync GitHub project changes from source to target organization')
+    parser.add_argument('--interval', type=int, default=INTERVAL,
+                        help='Seconds between the start of sync cycles')
+    parser.add_argument('--budget', type=int, default=BUDGET,
+                        help='Maximum number of item changes applied per cycle, the rest is applied in the next cycles')
+    parser.add_argument('--state', default=Common.SYNC_STATE_FILE_PATH,
+                        help='File keeping the field values synced so far')
+    parser.add_argument('--once', action='store_true',
+                        help='Run a single cycle and exit')
+    add_common_arguments(parser, requests=False, profile=False)
+    args = parser.parse_args()
+
+    apply_common_arguments(args, "sync.log")
+    GitHubSession.journal = IntentJournal(Common.INTENT_FILE_PATH)
+
+    org = os.environ['GITHUB_ORG']
+    token = os.environ['GITHUB_TOKEN']
+    org_target = os.environ['GITHUB_ORG_TARGET']
+    token_target = os.environ['GITHUB_TOKEN_TARGET']
+
+    if not org:
+        raise KeyError("The 'GITHUB_ORG' environment variable is missing.")
+    if not token:
+        raise KeyError("The 'GITHUB_TOKEN' environment variable is missing.")
+    if not org_target:
+        raise KeyError("The 'GITHUB_ORG_TARGET' environment variable is missing.")
+    if not token_target:
+        raise KeyError("The 'GITHUB_TOKEN_TARGET' environment variable is missing.")
+
+    sync_github_projects(org, token, org_target, token_target,
+                         args.interval, args.budget, args.state, args.once)
@@ -0,0 +1,6 @@
+'''Test setup shared by the test modules'''
+import os
+import sys
+
+# run from anywhere, the modules are in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
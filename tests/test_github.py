@@ -0,0 +1,77 @@
+'''Tests of the GitHub client in util/github.py'''
+import re
+import unittest
+
+from util.github import FIELD_VALUES_COUNT, GitHub, Project, ProjectV2Item
+from util.idempotency import NOT_APPLIED
+
+def draft_item(item_id, title):
+    '''Get a parsed draft item of the target project'''
+    return ProjectV2Item.from_node({'id': item_id, 'content': {'id': f"DI_{item_id}", 'title': title, 'body': ''},
+                                    'fieldValues': {'nodes': []}})
+
+class TestReconcileDrafts(unittest.TestCase):
+    '''Reconciliation of a draft batch after an ambiguous failure'''
+    def test_duplicate_titles(self):
+        '''Drafts with the same title in one batch match different items, the missing one is not applied'''
+        github = GitHub('org', 'token')
+        github.get_single_project_for_import = lambda project_id: ([], [draft_item('PVTI_1', 'Same'),
+                                                                        draft_item('PVTI_2', 'Other')])
+        data = github.reconcile_drafts('PVT_target', [('Same', ''), ('Same', ''), ('Other', '')], ['d0', 'd1', 'd2'])
+
+        self.assertEqual(data['data'], {'d0': {'projectItem': {'id': 'PVTI_1'}},
+                                        'd2': {'projectItem': {'id': 'PVTI_2'}}})
+        self.assertEqual(data['errors'], [{'path': ['d1'], 'message': NOT_APPLIED}])
+
+    def test_nothing_applied(self):
+        '''None when no draft of the batch exists'''
+        github = GitHub('org', 'token')
+        github.get_single_project_for_import = lambda project_id: ([], [])
+        self.assertIsNone(github.reconcile_drafts('PVT_target', [('Same', '')], ['d0']))
+
+def text_value(index):
+    '''Get a text field value node'''
+    return {'__typename': 'ProjectV2ItemFieldTextValue', 'text': f"Text {index}", 'field': {'name': f"Field {index}"}}
+
+class FieldValuesSession:
+    '''GraphQL endpoint with one page of items, the first item has more values than the items query pages'''
+    def __init__(self, values_count):
+        self.values = {'PVTI_1': [text_value(index) for index in range(values_count)], 'PVTI_2': [text_value(0)]}
+        self.queries = []
+
+    def page(self, item_id, count, cursor):
+        '''Get a fieldValues page of an item'''
+        start = int(cursor or 0)
+        end = start + count
+        return {'nodes': self.values[item_id][start:end],
+                'pageInfo': {'endCursor': str(end), 'hasNextPage': end < len(self.values[item_id])}}
+
+    def post(self, query, variables):
+        '''Answer the items query and the field values query'''
+        self.queries.append(query)
+        if 'items(first' in query:
+            nodes = [{'id': item_id, 'fieldValues': self.page(item_id, FIELD_VALUES_COUNT, None), 'content': None}
+                     for item_id in self.values]
+            return {'data': {'node': {'items': {'totalCount': len(nodes), 'nodes': nodes,
+                                                'pageInfo': {'endCursor': None, 'hasNextPage': False}}}}}
+        count = int(re.search(r'fieldValues\(first: (\d+)', query).group(1))
+        return {'data': {alias: {'fieldValues': self.page(variables[f"id{alias[1:]}"], count, variables[f"cursor{alias[1:]}"])}
+                         for alias in re.findall(r'(i\d+): node', query)}}
+
+class TestFieldValuesPages(unittest.TestCase):
+    '''Items with more field values than the items query pages'''
+    def test_overflowing_item(self):
+        '''Only the overflowing item is paged, the nodes keep the export format'''
+        github = GitHub('org', 'token')
+        github.session = FieldValuesSession(FIELD_VALUES_COUNT + 3)
+        project = Project('PVT_source')
+        project.fields = [[{'name': f"Field {index}", 'dataType': 'TEXT'} for index in range(FIELD_VALUES_COUNT + 3)]]
+
+        nodes = [node for page in project.iter_items(github) for node in page]
+
+        self.assertEqual(len(github.session.queries), 2)
+        self.assertEqual(nodes[0]['fieldValues'], {'nodes': github.session.values['PVTI_1']})
+        self.assertEqual(nodes[1]['fieldValues'], {'nodes': github.session.values['PVTI_2']})
+
+if __name__ == '__main__':
+    unittest.main()
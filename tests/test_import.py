@@ -0,0 +1,113 @@
+'''Tests of batched field value updates in import.py'''
+import os
+import re
+import tempfile
+import unittest
+
+from util.deadletter import DRAFT, FIELD_VALUE, dead_letters
+from util.github import GitHub, ProjectV2Field, ProjectV2Item, ProjectV2SingleSelectField
+from util.idempotency import AmbiguousResponse
+from util.importer import importer
+
+class FakeSession:
+    '''GraphQL endpoint answering every alias, a null variable fails the whole document as GitHub does'''
+    def __init__(self):
+        self.mutations = []
+
+    def post(self, query, variables, reconcile=None):
+        '''Answer a batched mutation'''
+        self.mutations.append((query, variables))
+        if any(value is None for name, value in variables.items() if name.startswith('value')):
+            return {'errors': [{'message': 'Variable $value has an invalid value (null)'}]}
+        data = {}
+        for alias in re.findall(r'(\w+): (?:addProjectV2DraftIssue|updateProjectV2ItemFieldValue)', query):
+            key = 'projectItem' if alias.startswith('d') else 'projectV2Item'
+            data[alias] = {key: {'id': f"PVTI_{alias}"}}
+        return {'data': data}
+
+def draft(field_values):
+    '''Get a parsed draft item with field values'''
+    return ProjectV2Item.from_node({'id': 'PVTI_source', 'content': {'id': 'DI_1', 'title': 'Draft', 'body': 'body'},
+                                    'fieldValues': {'nodes': field_values}})
+
+def select_value(name, field):
+    '''Get a single select field value node'''
+    return {'__typename': 'ProjectV2ItemFieldSingleSelectValue', 'name': name, 'field': {'name': field}}
+
+class TestFieldValueBatch(unittest.TestCase):
+    '''Field values of draft issues set in batches'''
+    def setUp(self):
+        self.github = GitHub('org', 'token')
+        self.session = FakeSession()
+        self.github.session = self.session
+        self.fields_info = [
+            ProjectV2SingleSelectField('F_status', 'Status', 'ProjectV2SingleSelectField',
+                                       [{'id': 'O_todo', 'name': 'Todo'}]),
+            ProjectV2SingleSelectField('F_size', 'Size', 'ProjectV2SingleSelectField',
+                                       [{'id': 'O_small', 'name': 'Small'}]),
+            ProjectV2Field('F_notes', 'Notes', 'ProjectV2Field')
+        ]
+
+    def test_unmapped_option_is_skipped(self):
+        '''resolve_field_value skips an option missing in the target'''
+        item = draft([select_value('Large', 'Size')])
+        self.assertIsNone(importer.resolve_field_value(item.field_values[0], self.fields_info))
+
+    def test_batch_with_unmapped_option(self):
+        '''Only the update of the unmapped option is skipped, the others of the batch are set'''
+        item = draft([select_value('Todo', 'Status'), select_value('Large', 'Size'),
+                      {'__typename': 'ProjectV2ItemFieldTextValue', 'text': 'note', 'field': {'name': 'Notes'}}])
+        with self.assertLogs(level='WARNING'):
+            succeed, fail = importer.insert_draft_issues(self.github, 'PVT_target', [item], self.fields_info)
+
+        self.assertEqual((succeed, fail), (1, 0))
+        _, variables = self.session.mutations[-1]
+        values = {variables[f"field{index}"]: variables[f"value{index}"] for index in range(2)}
+        self.assertEqual(values, {'F_status': 'O_todo', 'F_notes': 'note'})
+        self.assertNotIn('value2', variables)
+
+class TestFailedBatch(unittest.TestCase):
+    '''Units of a batch that raises are recorded as failed units'''
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        dead_letters.enable(os.path.join(self.folder.name, 'failed_units.log'))
+
+    def tearDown(self):
+        dead_letters.file.close()
+        dead_letters.file = None
+        self.folder.cleanup()
+
+    def test_raising_draft_batch(self):
+        '''Every draft of a raising batch is recorded as transient'''
+        github = GitHub('org', 'token')
+        def add_draft_issues(project_id, drafts):
+            raise AmbiguousResponse('no response after retries')
+        github.add_draft_issues = add_draft_issues
+        drafts = [draft([]), draft([])]
+        with self.assertLogs(level='ERROR'):
+            self.assertEqual(importer.insert_draft_issues(github, 'PVT_target', drafts, [], 'PVT_source'), (0, 2))
+
+        entries = dead_letters.take()
+        self.assertEqual([(entry['unit'], entry['category']) for entry in entries], [(DRAFT, 'transient')] * 2)
+
+    def test_item_without_content(self):
+        '''An item without content fails without a failed unit, a replay could not insert it'''
+        item = ProjectV2Item.from_node({'id': 'PVTI_source', 'content': None, 'fieldValues': {'nodes': []}})
+        with self.assertLogs(level='ERROR'):
+            self.assertFalse(importer.insert_item(item, GitHub('org', 'token'), 'PVT_target', [], None, 'PVT_source'))
+        self.assertEqual(dead_letters.take(), [])
+
+    def test_unsupported_field_value(self):
+        '''A failed field value of an unsupported type stays a failed unit'''
+        github = GitHub('org', 'token')
+        github.session = FakeSession()
+        github.get_single_project_for_import = lambda project_id: ([], None)
+        data = {'item_id': 'PVTI_target', 'value': {'__typename': 'ProjectV2ItemFieldLabelValue', 'field': {'name': 'Labels'}}}
+        with self.assertLogs(level='ERROR'):
+            importer.retry_field_values('PVT_source', github, 'PVT_target', [data])
+
+        entries = dead_letters.take()
+        self.assertEqual([(entry['unit'], entry['input']) for entry in entries], [(FIELD_VALUE, data)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+'''Tests of the files that survive a crash, the intent journal and the failed units'''
+import os
+import tempfile
+import unittest
+
+from util.deadletter import DeadLetters
+from util.idempotency import IntentJournal
+
+class TestTruncatedLine(unittest.TestCase):
+    '''A crash while writing leaves a truncated last line'''
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, name, text):
+        '''Write a file in the test folder'''
+        file_path = os.path.join(self.folder.name, name)
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return file_path
+
+    def test_intent_journal(self):
+        '''The journal starts and reports the readable unfinished intents'''
+        file_path = self.write('mutation_intents.log',
+                               '{"id":"a","state":"intent","time":0,"operation":"addProjectV2DraftIssue","variables":{}}\n'
+                               '{"id":"b","sta')
+        with self.assertLogs(level='WARNING'):
+            journal = IntentJournal(file_path)
+        # the start compacts the journal to the readable unfinished intents
+        self.assertEqual([intent['id'] for intent in IntentJournal.pending(file_path)], ['a'])
+        journal.close()
+
+    def test_dead_letters(self):
+        '''The readable failed units are replayed'''
+        file_path = self.write('failed_units.log', '{"unit":"field","input":{}}\n{"unit":"dr')
+        dead_letters = DeadLetters()
+        dead_letters.enable(file_path)
+        with self.assertLogs(level='WARNING'):
+            entries = dead_letters.take()
+        dead_letters.close()
+        self.assertEqual([entry['unit'] for entry in entries], ['field'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''archive.py'''
+import atexit
+import os
+import posixpath
+import threading
+import warnings
+import zipfile
+
+# Each project file is a separately compressed member and the zip central
+# directory is the index of member offsets, so a single project is read
+# without decompressing the others.
+class ProjectArchive:
+    '''Single compressed archive of the export folders'''
+    def __init__(self, file_path, mode='r'):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        self.zip = zipfile.ZipFile(file_path, mode, compression=zipfile.ZIP_DEFLATED)
+        atexit.register(self.close)
+
+    @staticmethod
+    def member(file_path):
+        '''Get member name of a file path relative to the working directory'''
+        return posixpath.normpath(os.path.normpath(file_path).replace(os.sep, '/'))
+
+    def write(self, file_path, data):
+        '''Write file data'''
+        with self.lock, warnings.catch_warnings():
+            # re-exported files are appended, the latest member is read
+            warnings.filterwarnings('ignore', 'Duplicate name', UserWarning)
+            self.zip.writestr(self.member(file_path), data)
+
+    def read(self, file_path):
+        '''Read file data'''
+        try:
+            return self.zip.read(self.member(file_path))
+        except KeyError as error:
+            raise FileNotFoundError(f"{file_path} not found in {self.file_path}") from error
+
+    def size(self, file_path):
+        '''Get uncompressed size of a file'''
+        try:
+            return self.zip.getinfo(self.member(file_path)).file_size
+        except KeyError as error:
+            raise FileNotFoundError(f"{file_path} not found in {self.file_path}") from error
+
+    def list(self, folder_path):
+        '''List file names in a folder from the archive index'''
+        prefix = self.member(folder_path) + '/'
+        names = dict.fromkeys(name[len(prefix):] for name in self.zip.namelist()
+                              if name.startswith(prefix) and '/' not in name[len(prefix):])
+        return list(names)
+
+    def exists(self, folder_path):
+        '''Check if folder has files in the archive'''
+        return bool(self.list(folder_path))
+
+    def close(self):
+        '''Close archive, writes the index when writing'''
+        with self.lock:
+            if self.zip.fp is not None:
+                self.zip.close()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''budget.py'''
+import logging
+import threading
+import time
+from util.comon import Common
+
+LISTED = 'listed'
+EXPLICIT = 'explicit'
+LARGEST = 'largest'
+SMALLEST = 'smallest'
+PRIORITIES = (LISTED, EXPLICIT, LARGEST, SMALLEST)
+
+class RunSchedule:
+    '''Project order, time/rate-limit point budget and resumable state of a run'''
+    def __init__(self, operation, seconds=None, points=None, priority=LISTED, projects=None,
+                 state_file=None, resume=False):
+        self.operation = operation
+        self.seconds = seconds
+        self.points = points
+        self.priority = priority
+        self.projects = projects or []
+        self.state_file = state_file
+        self.started = time.time()
+        # token pool -> points spent before it was tracked, pools are shared by the clients of a token
+        self.token_pools = {}
+        self.completed = []
+        self.remaining = []
+        self.stopped = None
+        self.lock = threading.Lock()
+        if resume:
+            self.completed = self.read_completed()
+
+    def read_completed(self):
+        '''Read projects completed by an earlier run of the same operation'''
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as file:
+                state = Common.json_loads(file.read())
+        except FileNotFoundError:
+            return []
+        if state.get('operation') != self.operation:
+            logging.warning('Run State Ignored - %s is for %s, not %s',
+                            self.state_file, state.get('operation'), self.operation)
+            return []
+        return list(state.get('completed', []))
+
+    def track(self, token_pool):
+        '''Count rate-limit points used by the tokens of a client against the budget'''
+        if token_pool not in self.token_pools:
+            self.token_pools[token_pool] = token_pool.spent
+
+    def spent(self):
+        '''Get rate-limit points used so far'''
+        return sum(token_pool.spent - spent for token_pool, spent in self.token_pools.items())
+
+    def plan(self, project_ids, size=None):
+        '''Order projects by the priority policy, skipping completed ones, size(project_id) ranks them'''
+        completed = set(self.completed)
+        if self.priority == EXPLICIT:
+            known = set(project_ids)
+            for project_id in self.projects:
+                if project_id not in known:
+                    logging.warning('Project Not Found - %s', project_id)
+            project_ids = [project_id for project_id in self.projects if project_id in known]
+        project_ids = [project_id for project_id in project_ids if project_id not in completed]
+        if self.priority in (LARGEST, SMALLEST) and size:
+            sizes = {project_id: size(project_id) for project_id in project_ids}
+            project_ids.sort(key=sizes.get, reverse=self.priority == LARGEST)
+        if completed:
+            logging.info('Run Resumed - %s: %s projects completed, %s remaining',
+                         self.operation, len(completed), len(project_ids))
+        with self.lock:
+            self.remaining = list(project_ids)
+        return project_ids
+
+    def exhausted(self):
+        '''Get the budget that ran out, None if there is budget left'''
+        if self.seconds is not None and time.time() - self.started >= self.seconds:
+            return 'time'
+        if self.points is not None and self.spent() >= self.points:
+            return 'points'
+        return None
+
+    def proceed(self):
+        '''Check if the next project may start, False once the budget ran out'''
+        with self.lock:
+            if self.stopped is None:
+                self.stopped = self.exhausted()
+                if self.stopped:
+                    logging.warning('Run Budget Exhausted (%s) - %s: %s projects completed, %s remaining, Elapsed: %d sec, Points: %s',
+                                    self.stopped, self.operation, len(self.completed), len(self.remaining),
+                                    time.time() - self.started, self.spent())
+                    self.write()
+            return self.stopped is None
+
+    def done(self, project_id):
+        '''Record a completed project'''
+        with self.lock:
+            self.completed.append(project_id)
+            if project_id in self.remaining:
+                self.remaining.remove(project_id)
+            self.write()
+
+    def write(self):
+        '''Write state atomically so that --resume continues where the run stopped'''
+        if not self.state_file:
+            return
+        state = {
+            'operation': self.operation,
+            'stopped': self.stopped,
+            'completed': self.completed,
+            'remaining': self.remaining
+        }
+        Common.write_json_atomic(self.state_file, state, pretty=True)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''cassette.py'''
+import atexit
+import collections
+import gzip
+import re
+import threading
+import time
+from util.comon import Common
+from util.responsecache import ResponseCache
+
+TOKEN_PATTERN = re.compile(r'gh[pousr]_[A-Za-z0-9]{20,}|github_pat_[A-Za-z0-9_]{20,}')
+
+class Cassette:
+    '''Record or replay GraphQL request/response pairs'''
+    RECORD = 'record'
+    REPLAY = 'replay'
+
+    def __init__(self, file_path, mode, latency=False):
+        self.file_path = file_path
+        self.mode = mode
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.secrets = []
+        self.records = collections.defaultdict(collections.deque)
+        if mode == Cassette.RECORD:
+            self.file = gzip.open(file_path, 'wt', encoding='utf-8')
+            atexit.register(self.close)
+        elif mode == Cassette.REPLAY:
+            self.file = None
+            self.load()
+        else:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+
+    @property
+    def replaying(self):
+        '''Check if cassette is in replay mode'''
+        return self.mode == Cassette.REPLAY
+
+    def load(self):
+        '''Load recorded responses'''
+        with gzip.open(self.file_path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                record = Common.json_loads(line)
+                self.records[record['key']].append(record)
+
+    def scrub(self, text):
+        '''Remove tokens from recorded text'''
+        for secret in self.secrets:
+            # short values are not real tokens and would corrupt the record
+            if len(secret) >= 8:
+                text = text.replace(secret, '***')
+        return TOKEN_PATTERN.sub('***', text)
+
+    def record(self, query, variables, status, elapsed, data):
+        '''Record request/response pair'''
+        line = Common.json_dumps({
+            'key': ResponseCache.key(query, variables),
+            'query': query.split('{', 1)[0].strip(),
+            'variables': variables,
+            'status': status,
+            'elapsed': round(elapsed, 4),
+            'response': data
+        })
+        with self.lock:
+            self.file.write(self.scrub(line) + '\n')
+
+    def replay(self, query, variables):
+        '''Get recorded response for request'''
+        key = ResponseCache.key(query, variables)
+        with self.lock:
+            records = self.records.get(key)
+            if not records:
+                raise KeyError(f"Request is not recorded in {self.file_path}: {query.split('{', 1)[0].strip()} {variables}")
+            # the same request can be recorded more than once, replay in order and keep the last one
+            record = records.popleft() if len(records) > 1 else records[0]
+        if self.latency:
+            time.sleep(record['elapsed'])
+        return record['response']
+
+    def close(self):
+        '''Close recording file'''
+        with self.lock:
+            if self.file and not self.file.closed:
+                self.file.close()
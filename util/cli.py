@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''cli.py'''
+from util.cassette import Cassette
+from util.comon import Common
+from util.concurrency import ConcurrencyController
+from util.githubsession import GitHubSession
+from util.logger import setup_logging
+from util.profiler import profiler
+from util.progress import Progress, progress
+from util.responsecache import ResponseCache
+
+def add_common_arguments(parser, requests=True, concurrency=True, status=True, profile=True):
+    '''Add the options shared by the entry points, logging options are always added'''
+    if requests:
+        parser.add_argument('--cache', action='store_true',
+                            help=f'Cache read query responses in {Common.CACHE_FILE_PATH}')
+        parser.add_argument('--cache-ttl', type=int, default=ResponseCache.TTL,
+                            help='Cache time to live in seconds')
+        cassette_group = parser.add_mutually_exclusive_group()
+        cassette_group.add_argument('--record', metavar='FILE',
+                                    help='Record GraphQL traffic to a cassette file')
+        cassette_group.add_argument('--replay', metavar='FILE',
+                                    help='Replay GraphQL traffic from a cassette file instead of the API')
+        parser.add_argument('--replay-latency', action='store_true',
+                            help='Sleep for the recorded latency of each replayed response')
+    if concurrency:
+        parser.add_argument('--max-concurrency', type=int, default=ConcurrencyController.MAXIMUM,
+                            help='Upper bound of the adaptive number of in-flight requests, also the number of worker threads')
+    if status:
+        parser.add_argument('--progress-interval', type=int, default=Progress.INTERVAL,
+                            help=f'Seconds between progress reports written to {Common.STATUS_FILE_PATH}, 0 to disable')
+    if profile:
+        parser.add_argument('--profile', action='store_true',
+                            help=f'Write per-phase wall/CPU time to the {Common.PROFILE_PATH} folder')
+        parser.add_argument('--profile-cprofile', action='store_true',
+                            help='Also write cProfile output per phase (with --profile)')
+        parser.add_argument('--profile-memory', action='store_true',
+                            help='Also trace peak memory at phase boundaries (with --profile)')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Log per-field details at debug level')
+    parser.add_argument('--log-sample', type=int, default=1,
+                        help='Log only one of every N debug records (with --verbose)')
+
+def apply_common_arguments(args, log_file):
+    '''Set up logging, the API client, progress and profiling from the options added by add_common_arguments'''
+    setup_logging(log_file, args.verbose, args.log_sample)
+    if getattr(args, 'cache', False):
+        GitHubSession.cache = ResponseCache(Common.CACHE_FILE_PATH, args.cache_ttl)
+    if getattr(args, 'record', None):
+        GitHubSession.cassette = Cassette(args.record, Cassette.RECORD)
+    elif getattr(args, 'replay', None):
+        GitHubSession.cassette = Cassette(args.replay, Cassette.REPLAY, args.replay_latency)
+    if hasattr(args, 'max_concurrency'):
+        GitHubSession.limiter = ConcurrencyController(args.max_concurrency)
+    if hasattr(args, 'progress_interval'):
+        progress.enable(Common.STATUS_FILE_PATH, args.progress_interval)
+    if getattr(args, 'profile', False):
+        profiler.enable(Common.PROFILE_PATH, args.profile_cprofile, args.profile_memory)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''columnar.py'''
+from util.comon import Common
+from util.github import FIELD_VALUE_TYPES, ProjectV2Item, parse_items
+
+COLUMNAR_FORMAT = 'columnar'
+COLUMNAR_VERSION = 1
+
+# field values stored as an index into the field's dictionary of distinct values
+DICTIONARY_TYPES = ('ProjectV2ItemFieldSingleSelectValue', 'ProjectV2ItemFieldIterationValue')
+
+def is_columnar(data):
+    '''Check if loaded items data is in columnar format'''
+    return isinstance(data, dict) and data.get('format') == COLUMNAR_FORMAT
+
+def encode_values(values):
+    '''Dictionary-encode values, returns (dictionary, indexes)'''
+    dictionary = []
+    positions = {}
+    indexes = []
+    for value in values:
+        if value is None:
+            indexes.append(None)
+            continue
+        index = positions.get(value)
+        if index is None:
+            index = positions[value] = len(dictionary)
+            dictionary.append(value)
+        indexes.append(index)
+    return dictionary, indexes
+
+def decode_values(dictionary, indexes):
+    '''Decode dictionary-encoded values'''
+    return [None if index is None else dictionary[index] for index in indexes]
+
+def encode_items(items):
+    '''Encode items column-wise'''
+    count = len(items)
+    columns = {}
+    for row, item in enumerate(items):
+        for value in item.field_values:
+            column = columns.get((value.field, value.typename))
+            if column is None:
+                column = columns[(value.field, value.typename)] = [None] * count
+            column[row] = value.value
+
+    fields = []
+    for (name, typename), column in columns.items():
+        field = {'name': name, 'typename': typename}
+        if typename in DICTIONARY_TYPES:
+            field['dictionary'], field['values'] = encode_values(column)
+        else:
+            field['values'] = column
+        fields.append(field)
+
+    repositories, repository_indexes = encode_values([item.repository for item in items])
+    content_types, content_type_indexes = encode_values([item.content_type for item in items])
+    return {
+        'format': COLUMNAR_FORMAT,
+        'version': COLUMNAR_VERSION,
+        'count': count,
+        'id': [item.id for item in items],
+        'content_types': content_types,
+        'content_type': content_type_indexes,
+        'content_id': [item.content_id for item in items],
+        'title': [item.title for item in items],
+        'body': [item.body for item in items],
+        'number': [item.number for item in items],
+        'repositories': repositories,
+        'repository': repository_indexes,
+        'fields': fields
+    }
+
+def decode_items(data):
+    '''Decode columnar data into items'''
+    if data.get('version') != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar version: {data.get('version')}")
+
+    count = data['count']
+    field_values = [[] for _ in range(count)]
+    for field in data['fields']:
+        value_class = FIELD_VALUE_TYPES[field['typename']][0]
+        name = field['name']
+        values = field['values']
+        if 'dictionary' in field:
+            values = decode_values(field['dictionary'], values)
+        for row, value in enumerate(values):
+            if value is not None:
+                field_values[row].append(value_class(value, name))
+
+    content_types = decode_values(data['content_types'], data['content_type'])
+    repositories = decode_values(data['repositories'], data['repository'])
+    return [ProjectV2Item(data['id'][row], content_types[row], data['content_id'][row],
+                          data['title'][row], data['body'][row], data['number'][row],
+                          repositories[row], tuple(field_values[row]))
+            for row in range(count)]
+
+def read_items(file_path):
+    '''Read items from an export file in json or columnar format'''
+    data = Common.read_json_from_file(file_path)
+    if is_columnar(data):
+        return decode_items(data)
+    return [item for page in data or [] for item in parse_items(page)]
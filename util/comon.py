@@ -3,6 +3,13 @@
 '''Common utility'''
 import os
 import json
+from util.profiler import profiler
+
+# fast JSON codec when installed, stdlib json otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 class Common:
     '''Common utility'''
@@ -12,15 +19,105 @@ class Common:
     FOLDER_ITEM_PATH = "projects_items"
     MAPPING_FILE_PATH = "project_mapping.log"
     MAPPING_ITEMS_FILE_PATH = "project_items_mapping.log"
+    CACHE_FILE_PATH = "github_cache.db"
+    STATUS_FILE_PATH = "status.json"
+    PROFILE_PATH = "profile"
+    INTENT_FILE_PATH = "mutation_intents.log"
+    SYNC_STATE_FILE_PATH = "sync_state.json"
+    RUN_STATE_FILE_PATH = "run_state.json"
+    DEAD_LETTER_FILE_PATH = "failed_units.log"
+    MANIFEST_FILE_PATH = "manifest.json"
+    IMPORTED_FILE_PATH = "imported.json"
+    PRETTY_JSON = False
+    ITEMS_FORMAT = "json"
+    # optional ProjectArchive used instead of the folders, set by the entry points
+    ARCHIVE = None
 
     def get_json_files(folder_path):
         '''Get JSON files in a folder'''
-        return [f for f in os.listdir(folder_path) if f.endswith('.json')]
+        with profiler.phase('discovery'):
+            if Common.ARCHIVE:
+                return [f for f in Common.ARCHIVE.list(folder_path) if f.endswith('.json')]
+            return [f for f in os.listdir(folder_path) if f.endswith('.json')]
+
+    def folder_exists(folder_path):
+        '''Check if a folder exists'''
+        if Common.ARCHIVE:
+            return Common.ARCHIVE.exists(folder_path)
+        return os.path.exists(folder_path)
+
+    def create_folder(folder_path):
+        '''Create a folder'''
+        if not Common.ARCHIVE:
+            os.makedirs(folder_path, exist_ok=True)
+
+    def json_dumps(data, pretty=False):
+        '''Serialize data to JSON string, compact unless pretty'''
+        if orjson:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0).decode('utf-8')
+        # same output as orjson, so checksums of exports do not depend on the installed codec
+        if pretty:
+            return json.dumps(data, indent=2, ensure_ascii=False)
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+    def json_loads(text):
+        '''Deserialize JSON string or bytes'''
+        if orjson:
+            return orjson.loads(text)
+        return json.loads(text)
 
     def write_json_to_file(file_path, data):
-        '''Write JSON data to a file'''
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=4)
+        '''Write JSON data to a file, returns the bytes written'''
+        with profiler.phase('serialize'):
+            if orjson:
+                content = orjson.dumps(data, option=orjson.OPT_INDENT_2 if Common.PRETTY_JSON else 0)
+            else:
+                content = Common.json_dumps(data, Common.PRETTY_JSON).encode('utf-8')
+            if Common.ARCHIVE:
+                Common.ARCHIVE.write(file_path, content)
+            else:
+                with open(file_path, 'wb') as file:
+                    file.write(content)
+            return content
+
+    def write_json_atomic(file_path, data, pretty=False, lines=False):
+        '''Write JSON data to a local file through a temporary file, lines writes each element on its own line'''
+        if lines:
+            content = ''.join(Common.json_dumps(element) + '\n' for element in data)
+        else:
+            content = Common.json_dumps(data, pretty)
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        # a crash leaves either the previous or the new file, never a partial one
+        os.replace(temp_path, file_path)
+
+    def read_json_from_file(file_path, archive=True):
+        '''Read JSON data from a file, local state files next to an archive are read with archive=False'''
+        with profiler.phase('serialize'):
+            if archive and Common.ARCHIVE:
+                return Common.json_loads(Common.ARCHIVE.read(file_path))
+            if orjson:
+                with open(file_path, 'rb') as file:
+                    return orjson.loads(file.read())
+            with open(file_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+
+    def read_bytes_from_file(file_path):
+        '''Read raw content of a file'''
+        if Common.ARCHIVE:
+            return Common.ARCHIVE.read(file_path)
+        with open(file_path, 'rb') as file:
+            return file.read()
+
+    def file_size(file_path):
+        '''Get size of a file, 0 if missing'''
+        try:
+            if Common.ARCHIVE:
+                return Common.ARCHIVE.size(file_path)
+            return os.path.getsize(file_path)
+        except FileNotFoundError:
+            return 0
 
     def project_id_list(folder_path):
         '''Get project ID list from JSON files'''
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''concurrency.py'''
+import logging
+import threading
+import time
+from util.responsecache import is_mutation
+
+class AdaptiveLimit:
+    '''Limit of in-flight requests, increased additively while healthy and cut multiplicatively on errors or slow responses'''
+    INCREASE = 1.0
+    DECREASE = 0.5
+    # response slower than this factor of the baseline latency counts as congestion
+    LATENCY_FACTOR = 2.0
+    # weight of the latest healthy response in the baseline latency
+    ALPHA = 0.1
+
+    def __init__(self, name, initial, maximum, minimum=1):
+        self.name = name
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.latency = None
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        '''Wait for a free slot, returns the start time for release'''
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight = self.in_flight + 1
+            return time.time()
+
+    def release(self, started, elapsed, healthy):
+        '''Release the slot and adjust the limit from the outcome'''
+        with self.condition:
+            self.in_flight = self.in_flight - 1
+            slow = self.latency is not None and elapsed > self.latency * self.LATENCY_FACTOR
+            if not healthy or slow:
+                # requests sent before the last cut reflect the old limit
+                if started >= self.last_decrease:
+                    self.limit = max(self.limit * self.DECREASE, self.minimum)
+                    self.last_decrease = time.time()
+                    logging.debug('Concurrency Decreased - %s: %.1f (%s)', self.name, self.limit,
+                                  'slow' if healthy else 'error')
+            else:
+                # one slot more per limit's worth of healthy responses
+                self.limit = min(self.limit + self.INCREASE / self.limit, self.maximum)
+            if healthy:
+                self.latency = elapsed if self.latency is None else \
+                    (1 - self.ALPHA) * self.latency + self.ALPHA * elapsed
+            self.condition.notify_all()
+
+class ConcurrencyController:
+    '''Separate adaptive limits for read queries and mutations'''
+    INITIAL = 4
+    MAXIMUM = 16
+
+    def __init__(self, maximum=MAXIMUM):
+        initial = min(self.INITIAL, maximum)
+        self.reads = AdaptiveLimit('read', initial, maximum)
+        self.mutations = AdaptiveLimit('mutation', initial, maximum)
+
+    def workers(self):
+        '''Get the number of threads that can keep the limits busy, the limits decide what is in flight'''
+        return max(self.reads.maximum, self.mutations.maximum)
+
+    def limit(self, query):
+        '''Get the limit a request is subject to'''
+        return self.mutations if is_mutation(query) else self.reads
+
+    def limits(self):
+        '''Get current limits'''
+        return {limit.name: int(limit.limit) for limit in (self.reads, self.mutations)}
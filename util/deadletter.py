@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''deadletter.py'''
+import logging
+import os
+import re
+import threading
+import time
+import requests
+from util.comon import Common
+from util.github import FIELD_VALUE_TYPES, ProjectV2Item
+from util.idempotency import AmbiguousResponse
+
+# failed units
+ITEM = 'item'
+DRAFT = 'draft'
+FIELD = 'field'
+FIELD_VALUE = 'field_value'
+# replay order, fields first so that the values of the other units can be resolved
+UNITS = (FIELD, ITEM, DRAFT, FIELD_VALUE)
+
+# error categories
+NOT_FOUND = 'not_found'
+RATE_LIMITED = 'rate_limited'
+VALIDATION = 'validation'
+TRANSIENT = 'transient'
+
+# (category, pattern of the error message), checked in order
+ERROR_PATTERNS = (
+    (RATE_LIMITED, re.compile(r'RATE_LIMITED|rate limit|abuse', re.IGNORECASE)),
+    (NOT_FOUND, re.compile(r'NOT_FOUND|Could not resolve|not found', re.IGNORECASE)),
+    (TRANSIENT, re.compile(r'timed? ?out|Something went wrong|\b50[0234]\b|temporarily', re.IGNORECASE))
+)
+
+def classify(error):
+    '''Classify an exception or error message of a failed unit'''
+    if isinstance(error, (AmbiguousResponse, requests.Timeout, requests.ConnectionError)):
+        return TRANSIENT
+    message = str(error)
+    for category, pattern in ERROR_PATTERNS:
+        if pattern.search(message):
+            return category
+    # the API rejected the input
+    return VALIDATION
+
+def value_node(value):
+    '''Get a parsed field value as the export has it'''
+    _, key = FIELD_VALUE_TYPES[value.typename]
+    return {'__typename': value.typename, key: value.value, 'field': {'name': value.field}}
+
+def item_node(item):
+    '''Get a parsed item with content as the export has it, ProjectV2Item.from_node parses it back'''
+    if item.content_type == ProjectV2Item.ISSUE:
+        content = {'id': item.content_id, 'number': item.number, 'title': item.title,
+                   'repository': {'name': item.repository}}
+    elif item.content_type == ProjectV2Item.DRAFT_ISSUE:
+        content = {'id': item.content_id, 'title': item.title, 'body': item.body}
+    else:
+        # a replay cannot insert an item without content
+        raise ValueError(f"Item has no content: {item.id}")
+    return {'id': item.id, 'content': content,
+            'fieldValues': {'nodes': [value_node(value) for value in item.field_values]}}
+
+class DeadLetters:
+    '''Failed units with their inputs and classified errors, replayed by --retry-failed'''
+    def __init__(self):
+        self.file = None
+        self.file_path = None
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def enable(self, file_path):
+        '''Append failed units to a file'''
+        self.file_path = file_path
+        self.counts = {}
+        self.file = open(file_path, 'a', encoding='utf-8')
+
+    def record(self, unit, project_id, mapped_project_id, data, error):
+        '''Record a failed unit, data holds the input to replay it'''
+        if self.file is None:
+            return
+        category = classify(error)
+        entry = {'unit': unit, 'project_id': project_id, 'mapped_project_id': mapped_project_id,
+                 'category': category, 'error': str(error), 'time': time.time(), 'input': data}
+        with self.lock:
+            self.file.write(Common.json_dumps(entry) + '\n')
+            self.file.flush()
+            self.counts[category] = self.counts.get(category, 0) + 1
+
+    def take(self):
+        '''Read recorded units to replay, the file is kept as <file>.retried and restarted empty'''
+        entries = []
+        with self.lock:
+            self.file.close()
+            try:
+                with open(self.file_path, 'r', encoding='utf-8') as file:
+                    for line in file:
+                        if not line.strip():
+                            continue
+                        try:
+                            entries.append(Common.json_loads(line))
+                        except ValueError:
+                            # a crash while writing leaves a truncated line
+                            logging.warning('Unreadable Failed Unit Skipped - %s: %s', self.file_path, line.strip())
+                os.replace(self.file_path, f"{self.file_path}.retried")
+            except FileNotFoundError:
+                pass
+            self.file = open(self.file_path, 'a', encoding='utf-8')
+        return entries
+
+    def close(self):
+        '''Close the file and log failed units by category'''
+        with self.lock:
+            if self.file is None or self.file.closed:
+                return
+            self.file.close()
+            if self.counts:
+                logging.warning('Failed Units - %s, recorded in %s',
+                                ', '.join(f"{category}: {count}" for category, count in sorted(self.counts.items())),
+                                self.file_path)
+
+dead_letters = DeadLetters()
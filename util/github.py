@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf_8 -*-
 '''github.py'''
-from util.githubsession import GitHubSession
+import sys
+from util.githubsession import sessions
+from util.idempotency import NOT_APPLIED
+from util.profiler import profiler
+from util.progress import progress
 
 class ProjectV2Field:
     '''ProjectV2Field class to store field data'''
@@ -24,52 +28,269 @@ class ProjectV2SingleSelectField(ProjectV2Field):
 
 class ProjectV2ItemFieldValueCommon:
     '''ProjectV2ItemFieldValueCommon class to store item field value data'''
+    __slots__ = ('field', 'value')
+    typename = None
+    type = None
+
     def __init__(self, field):
         self.field = field
 
 class ProjectV2ItemFieldTextValue(ProjectV2ItemFieldValueCommon):
     '''ProjectV2ItemFieldTextValue class to store text field value data'''
+    __slots__ = ()
+    typename = 'ProjectV2ItemFieldTextValue'
+    type = 'text'
+
     def __init__(self, text, field):
         super().__init__(field)
-        self.type = 'text'
         self.value = text
 
 class ProjectV2ItemFieldDateValue(ProjectV2ItemFieldValueCommon):
     '''ProjectV2ItemFieldDateValue class to store date field value data'''
+    __slots__ = ()
+    typename = 'ProjectV2ItemFieldDateValue'
+    type = 'date'
+
     def __init__(self, date, field):
         super().__init__(field)
-        self.type = 'date'
         self.value = date
 
 class ProjectV2ItemFieldSingleSelectValue(ProjectV2ItemFieldValueCommon):
     '''ProjectV2ItemFieldSingleSelectValue class to store single select field value data'''
+    __slots__ = ()
+    typename = 'ProjectV2ItemFieldSingleSelectValue'
+    type = 'single_select'
+
     def __init__(self, name, field):
         super().__init__(field)
-        self.type = 'single_select'
         self.value = name
 
 class ProjectV2ItemFieldNumberValue(ProjectV2ItemFieldValueCommon):
     '''ProjectV2ItemFieldNumberValue class to store number field value data'''
+    __slots__ = ()
+    typename = 'ProjectV2ItemFieldNumberValue'
+    type = 'number'
+
     def __init__(self, number, field):
         super().__init__(field)
-        self.type = 'number'
         self.value = number
 
 class ProjectV2ItemFieldIterationValue(ProjectV2ItemFieldValueCommon):
     '''ProjectV2ItemFieldIterationValue class to store iteration field value data'''
+    __slots__ = ()
+    typename = 'ProjectV2ItemFieldIterationValue'
+    type = 'iteration'
+
     def __init__(self, iteration, field):
         super().__init__(field)
-        self.type = 'iteration'
         self.value = iteration
 
+# typename -> (class, key of the value in the GraphQL node)
+FIELD_VALUE_TYPES = {
+    'ProjectV2ItemFieldTextValue': (ProjectV2ItemFieldTextValue, 'text'),
+    'ProjectV2ItemFieldDateValue': (ProjectV2ItemFieldDateValue, 'date'),
+    'ProjectV2ItemFieldSingleSelectValue': (ProjectV2ItemFieldSingleSelectValue, 'name'),
+    'ProjectV2ItemFieldNumberValue': (ProjectV2ItemFieldNumberValue, 'number'),
+    'ProjectV2ItemFieldIterationValue': (ProjectV2ItemFieldIterationValue, 'title')
+}
+
+# value_type -> key of the value in ProjectV2FieldValue input
+FIELD_VALUE_KEYS = {
+    'text': 'text',
+    'iteration': 'iterationId',
+    'selection': 'singleSelectOptionId',
+    'date': 'date',
+    'number': 'number'
+}
+
+# value_type -> GraphQL type of the value variable
+FIELD_VALUE_GRAPHQL_TYPES = {
+    'text': 'String',
+    'iteration': 'String',
+    'selection': 'String',
+    'date': 'Date',
+    'number': 'Float'
+}
+
+def batch_errors(data, aliases):
+    '''Map errors of an aliased mutation to each alias, None if succeeded'''
+    errors = {alias: None for alias in aliases}
+    for error in data.get('errors', []):
+        path = error.get('path') or []
+        message = error.get('message', str(error))
+        if path and path[0] in errors:
+            errors[path[0]] = message
+        else:
+            # errors without path fail the whole document
+            return {alias: message for alias in aliases}
+    results = data.get('data') or {}
+    for alias in aliases:
+        if errors[alias] is None and not results.get(alias):
+            errors[alias] = f"No result in response: {data}"
+    return errors
+
+def parse_field_value(node):
+    '''Parse field value node, None for unsupported types'''
+    value_type = FIELD_VALUE_TYPES.get(node.get('__typename'))
+    if value_type is None:
+        return None
+    value_class, key = value_type
+    field_name = (node.get('field') or {}).get('name')
+    return value_class(node.get(key), sys.intern(field_name) if field_name else field_name)
+
+class ProjectV2Item:
+    '''ProjectV2Item class to store item data'''
+    __slots__ = ('id', 'content_type', 'content_id', 'title', 'body', 'number', 'repository', 'field_values')
+    DRAFT_ISSUE = 'DI'
+    ISSUE = 'I'
+
+    def __init__(self, item_id, content_type, content_id, title, body, number, repository, field_values):
+        self.id = item_id
+        self.content_type = content_type
+        self.content_id = content_id
+        self.title = title
+        self.body = body
+        self.number = number
+        self.repository = repository
+        self.field_values = field_values
+
+    @classmethod
+    def from_node(cls, node):
+        '''Parse item node from GraphQL response or export file'''
+        content = node.get('content')
+        field_values = tuple(value for value in map(parse_field_value, (node.get('fieldValues') or {}).get('nodes', []))
+                             if value is not None)
+        if not content:
+            return cls(node.get('id'), None, None, None, None, None, None, field_values)
+        if 'repository' in content:
+            return cls(node.get('id'), ProjectV2Item.ISSUE, content['id'], content.get('title', ''), None,
+                       content.get('number'), sys.intern(content['repository']['name']), field_values)
+        return cls(node.get('id'), ProjectV2Item.DRAFT_ISSUE, content['id'], content.get('title', ''),
+                   content.get('body', ''), None, None, field_values)
+
+def parse_items(nodes):
+    '''Parse item nodes with content'''
+    return [ProjectV2Item.from_node(node) for node in nodes if 'content' in node]
+
+# field dataType -> typename of its item field values
+FIELD_DATA_TYPES = {
+    'TITLE': 'ProjectV2ItemFieldTextValue',
+    'TEXT': 'ProjectV2ItemFieldTextValue',
+    'DATE': 'ProjectV2ItemFieldDateValue',
+    'SINGLE_SELECT': 'ProjectV2ItemFieldSingleSelectValue',
+    'NUMBER': 'ProjectV2ItemFieldNumberValue',
+    'ITERATION': 'ProjectV2ItemFieldIterationValue'
+}
+
+# fieldValues page of the items query, every field with a value has a node including types that are not selected,
+# items with more values get the rest with field_values_query
+FIELD_VALUES_COUNT = 8
+FIELD_VALUES_PAGE_SIZE = 100
+
+def field_value_typenames(fields):
+    '''Get the field value types the project fields have, all types when the fields are unknown'''
+    if not fields:
+        return set(FIELD_VALUE_TYPES)
+    data_types = {field.get('dataType') for page in fields for field in page}
+    return {FIELD_DATA_TYPES[data_type] for data_type in data_types if data_type in FIELD_DATA_TYPES}
+
+def field_values_selection(typenames, count, cursor=None):
+    '''Build the fieldValues selection of the given value types, empty if none is selected'''
+    fragments = ''.join(f'''
+                      ... on {typename} {{
+                        {key}
+                        field {{
+                          ... on ProjectV2FieldCommon {{
+                            name
+                          }}
+                        }}
+                      }}''' for typename, (_, key) in FIELD_VALUE_TYPES.items() if typename in typenames)
+    if not fragments:
+        return ''
+    after = f', after: {cursor}' if cursor else ''
+    return f'''
+                  fieldValues(first: {count}{after}) {{
+                    nodes {{
+                      __typename{fragments}
+                    }}
+                    pageInfo {{
+                      endCursor
+                      hasNextPage
+                    }}
+                  }}'''
+
+def field_values_query(fields, count):
+    '''Build the query of the next field values page of count items, aliased i0, i1, ...'''
+    typenames = field_value_typenames(fields)
+    declarations = ', '.join(f'$id{index}: ID!, $cursor{index}: String' for index in range(count))
+    nodes = ''.join(f'''
+            i{index}: node(id: $id{index}) {{
+              ... on ProjectV2Item {{{field_values_selection(typenames, FIELD_VALUES_PAGE_SIZE, f'$cursor{index}')}
+              }}
+            }}''' for index in range(count))
+    return f'''
+          query({declarations}) {{{nodes}
+          }}
+        '''
+
+def items_query(fields=None, values=True):
+    '''Build the items query selecting only the field value types the project fields have'''
+    field_values = field_values_selection(field_value_typenames(fields), FIELD_VALUES_COUNT) if values else ''
+
+    return f'''
+          query($id: ID!, $cursor: String) {{
+          node(id: $id) {{
+            ... on ProjectV2 {{
+              items(first: 20, after: $cursor) {{
+                totalCount
+                nodes {{
+                  id{field_values}
+                  content {{
+                    ... on DraftIssue {{
+                      id
+                      title
+                      body
+                    }}
+                    ... on Issue {{
+                      id
+                      number
+                      title
+                      repository {{
+                        name
+                      }}
+                    }}
+                    ... on PullRequest {{
+                      id
+                      number
+                      title
+                      repository {{
+                        name
+                      }}
+                    }}
+                  }}
+                }}
+                pageInfo {{
+                  endCursor
+                  hasNextPage
+                }}
+              }}
+            }}
+          }}
+        }}
+        '''
+
 class Project:
     '''Project class to store project data'''
+    # fetch views with field ids only, set by the entry points
+    normalize_views = False
+
     def __init__(self, project_id):
         self.project_id = project_id
         self.project_meta = []
         self.fields = []
         self.views = []
         self.items = []
+        self.items_count = None
 
     def fetch_fields(self, github):
         '''Fetch fields for the project'''
@@ -133,8 +354,7 @@ class Project:
         }
 
         while True:
-            github_session = GitHubSession(github.endpoint, github.headers)
-            data = github_session.post(query, variables)
+            data = github.session.post(query, variables)
 
             self.fields.append(data['data']['node']['fields']['nodes'])
 
@@ -146,109 +366,30 @@ class Project:
 
     def fetch_items(self, github):
         '''Fetch items for the project'''
-        query = '''
-          query($id: ID!, $cursor: String) {
-          node(id: $id) {
-            ... on ProjectV2 {
-              items(first: 20, after: $cursor) {
-                nodes {
-                  id
-                  fieldValues(first: 8) {
-                    nodes {
-                      __typename
-                      ... on ProjectV2ItemFieldTextValue {
-                        text
-                        field {
-                          ... on ProjectV2FieldCommon {
-                            name
-                          }
-                        }
-                      }
-                      ... on ProjectV2ItemFieldDateValue {
-                        date
-                        field {
-                          ... on ProjectV2FieldCommon {
-                            name
-                          }
-                        }
-                      }
-                      ... on ProjectV2ItemFieldSingleSelectValue {
-                        name
-                        field {
-                          ... on ProjectV2FieldCommon {
-                            name
-                          }
-                        }
-                      }
-                      ... on ProjectV2ItemFieldNumberValue{
-                        number
-                        field {
-                          ... on ProjectV2FieldCommon {
-                            name
-                          }
-                        }
-                      }
-                      ... on ProjectV2ItemFieldIterationValue {
-                        title
-                        startDate
-                        duration
-                        field {
-                          ... on ProjectV2FieldCommon {
-                            name
-                          }
-                        }
-                      }
-                    }
-                  }
-                  content {
-                    ... on DraftIssue {
-                      id
-                      title
-                      body
-                    }
-                    ... on Issue {
-                      id
-                      number
-                      title
-                      repository {
-                        id
-                        name
-                      }
-                    }
-                    ... on PullRequest {
-                      id
-                      number
-                      title
-                      repository {
-                        id
-                        name
-                      }
-                    }
-                  }
-                }
-                pageInfo {
-                  endCursor
-                  hasNextPage
-                }
-              }
-            }
-          }
-        }
-        '''
+        for nodes in self.iter_items(github):
+            if not self.items:
+                progress.start_project(self.project_id, self.items_count)
+            progress.advance(self.project_id, len(nodes))
+            self.items.append(nodes)
+
+    def iter_items(self, github, values=True):
+        '''Iterate pages of items for the project as they are fetched, values=False skips field values'''
+        query = items_query(self.fields, values)
         variables = {
             "id": self.project_id,
             "cursor": None
         }
 
         while True:
-            github_session = GitHubSession(github.endpoint, github.headers)
-            data = github_session.post(query, variables)
+            data = github.session.post(query, variables)
 
             if 'data' not in data:
                 raise KeyError(f"'data' key not found in response: {data}")
 
             items_data = data['data']['node']['items']
-            self.items.append(items_data['nodes'])
+            self.items_count = items_data.get('totalCount')
+            self.fetch_field_values(github, items_data['nodes'])
+            yield items_data['nodes']
 
             page_info = items_data['pageInfo']
             if page_info['hasNextPage']:
@@ -256,6 +397,30 @@ class Project:
             else:
                 break
 
+    def fetch_field_values(self, github, nodes):
+        '''Fetch the field values of items with more values than the items query pages, exports keep no pageInfo'''
+        pending = []
+        for node in nodes:
+            page_info = (node.get('fieldValues') or {}).pop('pageInfo', None)
+            if page_info and page_info['hasNextPage']:
+                pending.append((node, page_info['endCursor']))
+
+        while pending:
+            batch, pending = pending[:github.BATCH_SIZE], pending[github.BATCH_SIZE:]
+            variables = {}
+            for index, (node, cursor) in enumerate(batch):
+                variables[f"id{index}"] = node['id']
+                variables[f"cursor{index}"] = cursor
+            data = github.session.post(field_values_query(self.fields, len(batch)), variables)
+            if 'data' not in data:
+                raise KeyError(f"'data' key not found in response: {data}")
+
+            for index, (node, _) in enumerate(batch):
+                page = data['data'][f"i{index}"]['fieldValues']
+                node['fieldValues']['nodes'].extend(page['nodes'])
+                if page['pageInfo']['hasNextPage']:
+                    pending.append((node, page['pageInfo']['endCursor']))
+
     def fetch_views(self, github):
         '''Fetch views for the project'''
         query = '''
@@ -368,14 +533,67 @@ class Project:
               }
             }
             '''
+        if self.normalize_views:
+            # view fields are only referenced by id, util.views joins them with the project fields
+            query = '''
+            query($id: ID!, $cursor: String) {
+              node(id: $id) {
+                ... on ProjectV2 {
+                  views(first: 20, after: $cursor) {
+                    nodes {
+                      id
+                      name
+                      number
+                      layout
+                      filter
+                      sortByFields(first: 20) {
+                        nodes {
+                          direction
+                          field {
+                            ... on ProjectV2FieldCommon {
+                              id
+                            }
+                          }
+                        }
+                      }
+                      groupByFields(first: 20) {
+                        nodes {
+                          ... on ProjectV2FieldCommon {
+                            id
+                          }
+                        }
+                      }
+                      verticalGroupByFields(first: 20) {
+                        nodes {
+                          ... on ProjectV2FieldCommon {
+                            id
+                          }
+                        }
+                      }
+                      fields(first: 20) {
+                        nodes {
+                          ... on ProjectV2FieldCommon {
+                            id
+                          }
+                        }
+                      }
+                    }
+                    pageInfo {
+                      endCursor
+                      hasNextPage
+                    }
+                  }
+                }
+              }
+            }
+            '''
         variables = {
                 "id": self.project_id,
                 "cursor": None
         }
 
         while True:
-            github_session = GitHubSession(github.endpoint, github.headers)
-            data = github_session.post(query, variables)
+            data = github.session.post(query, variables)
 
             if 'data' not in data:
                 raise KeyError(f"'data' key not found in response: {data}")
@@ -391,14 +609,19 @@ class Project:
 
 class GitHub:
     '''GitHub class'''
+    # number of aliased operations per batched mutation
+    BATCH_SIZE = 20
+
     def __init__(self, org, token):
         self.endpoint = 'https://api.github.com/graphql'
         self.org = org
         self.token = token
-        self.headers={'Authorization': f'bearer {self.token}',
-                      'Accept': 'application/vnd.github.v3+json'}
+        # token can be a comma-separated pool, Authorization is set per request
+        self.headers={'Accept': 'application/vnd.github.v3+json'}
+        # clients of the same token share its rate limit and connections
+        self.token_pool, self.session = sessions.get(self.endpoint, self.headers, token)
 
-    def get_projects(self, include_all=False):
+    def get_projects(self):
         '''get_projects'''
         query = '''
         query($organization: String!) {
@@ -423,30 +646,28 @@ class GitHub:
         variables = {
             "organization": f'{self.org}'
         }
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        with profiler.phase('discovery'):
+            data = self.session.post(query, variables)
 
         if 'data' not in data:
             raise KeyError(f"The 'data' key is missing in the response. Response content: {data}")
 
         projects = []
-        for node in data['data']['organization']['projectsV2']['nodes']:
+        nodes = data['data']['organization']['projectsV2']['nodes']
+        for node in nodes:
             project = Project(
                 project_id = node['id']
             )
             project.project_meta = node
-            if include_all:
-              project.fetch_fields(self)
-              project.fetch_views(self)
-              project.fetch_items(self)
             projects.append(project)
 
         return projects
 
-    def fetch_project_data(self, project_id, data_type):
-        '''fetch project data based on type'''
+    def fetch_project_data(self, project_id, data_type, fields=None):
+        '''fetch project data based on type, fields are the exported fields to build the items query from'''
         try:
             project = Project(project_id=project_id)
+            project.fields = fields or []
             if data_type == 'fields':
                 project.fetch_fields(self)
             elif data_type == 'views':
@@ -468,9 +689,9 @@ class GitHub:
         '''fetch project views'''
         return self.fetch_project_data(project_id, 'views')
 
-    def fetch_project_items(self, project_id):
+    def fetch_project_items(self, project_id, fields=None):
         '''fetch project items'''
-        return self.fetch_project_data(project_id, 'items')
+        return self.fetch_project_data(project_id, 'items', fields)
     
     def get_single_project_for_import(self, target_project_id):
         '''get_single_project for import'''
@@ -479,38 +700,39 @@ class GitHub:
                 project_id = target_project_id
             )
             project.fetch_fields(self)
-            project.fetch_items(self)
+            # only draft titles and content ids of the target items are used
+            project.items = list(project.iter_items(self, values=False))
 
             # fields
             fields = []
-            for field_data in project.fields[0]:
-                typename = field_data.get("__typename")
-                if typename == "ProjectV2SingleSelectField":
-                    field = ProjectV2SingleSelectField(
-                        field_data["id"],
-                        field_data["name"],
-                        typename,
-                        field_data["options"]
-                    )
-                elif typename == "ProjectV2IterationField":
-                    field = ProjectV2IterationField(
-                        field_data["id"],
-                        field_data["name"],
-                        typename,
-                        field_data["configuration"]
-                    )
-                else:
-                    field = ProjectV2Field(
-                        field_data["id"],
-                        field_data["name"],
-                        typename
-                    )
-                fields.append(field)
+            for page in project.fields:
+                for field_data in page:
+                    typename = field_data.get("__typename")
+                    if typename == "ProjectV2SingleSelectField":
+                        field = ProjectV2SingleSelectField(
+                            field_data["id"],
+                            field_data["name"],
+                            typename,
+                            field_data["options"]
+                        )
+                    elif typename == "ProjectV2IterationField":
+                        field = ProjectV2IterationField(
+                            field_data["id"],
+                            field_data["name"],
+                            typename,
+                            field_data["configuration"]
+                        )
+                    else:
+                        field = ProjectV2Field(
+                            field_data["id"],
+                            field_data["name"],
+                            typename
+                        )
+                    fields.append(field)
 
             # draft items
-            items = project.items[0]
-            draft_items = [{'id': item['content']['id'], 'title': item['content']['title']}
-                           for item in items]
+            draft_items = [item for page in project.items for item in parse_items(page)
+                           if item.content_id is not None]
 
             return fields, draft_items
 
@@ -536,8 +758,8 @@ class GitHub:
             "title": project['title'],
             "ownerId": owner_id
         }
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        data = self.session.post(query, variables,
+                                 lambda: self.reconcile_project('createProjectV2', project['title']))
         if 'data' in data and 'createProjectV2' in data['data'] and \
             'projectV2' in data['data']['createProjectV2']:
             project_id = data['data']['createProjectV2']['projectV2']['id']
@@ -545,6 +767,69 @@ class GitHub:
 
         raise ValueError(f"Failed to create project: {data}")
 
+    def copy_project(self, template_id, project, owner_id):
+        '''copy_project'''
+        query = '''
+        mutation($projectId: ID!, $title: String!, $ownerId: ID!) {
+          copyProjectV2(input: {
+            projectId: $projectId
+            title: $title
+            ownerId: $ownerId
+            includeDraftIssues: false
+          }) {
+            projectV2 {
+              id
+              title
+            }
+          }
+        }
+        '''
+        variables = {
+            "projectId": template_id,
+            "title": project['title'],
+            "ownerId": owner_id
+        }
+        data = self.session.post(query, variables,
+                                 lambda: self.reconcile_project('copyProjectV2', project['title']))
+        if 'data' in data and data['data'].get('copyProjectV2') and \
+            'projectV2' in data['data']['copyProjectV2']:
+            return data['data']['copyProjectV2']['projectV2']['id']
+
+        raise ValueError(f"Failed to copy project: {data}")
+
+    def find_project(self, title):
+        '''find_project by exact title, the latest created if there are several'''
+        query = '''
+        query($organization: String!, $title: String!) {
+          organization(login: $organization) {
+            projectsV2(first: 20, query: $title, orderBy: {field: CREATED_AT, direction: DESC}) {
+              nodes {
+                id
+                title
+              }
+            }
+          }
+        }
+        '''
+        variables = {
+            "organization": self.org,
+            "title": title
+        }
+        data = self.session.post(query, variables)
+        if 'errors' in data:
+            raise ValueError(f"Failed to find project: {data}")
+        for node in data['data']['organization']['projectsV2']['nodes']:
+            if node['title'] == title:
+                return node
+        return None
+
+    def reconcile_project(self, operation, title):
+        '''Get response of a project creation that was applied, None if not applied'''
+        project = self.find_project(title)
+        if project is None:
+            return None
+        return {'data': {operation: {'projectV2': project}}}
+
     def update_project(self, project_id, project):
         '''update_project'''
         query = '''
@@ -576,8 +861,7 @@ class GitHub:
             "readme": project.get('readme'),
             "shortDescription": project.get('shortDescription')
         }
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        data = self.session.post(query, variables)
         if 'data' in data and 'updateProjectV2' in data['data'] and \
             'projectV2' in data['data']['updateProjectV2']:
             project_id = data['data']['updateProjectV2']['projectV2']['id']
@@ -599,8 +883,7 @@ class GitHub:
         variables = {
             "login": self.org
         }
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        data = self.session.post(query, variables)
         return data['data']['organization']['id']
 
     def create_field(self, project_id, data_type, name):
@@ -622,8 +905,7 @@ class GitHub:
             "name": name
         }
 
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        data = self.session.post(query, variables)
         if 'errors' in data:
             raise ValueError(f"Failed to create field: {data}")
 
@@ -650,13 +932,63 @@ class GitHub:
             "options": options
         }
 
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        data = self.session.post(query, variables)
         if 'errors' in data:
             raise ValueError(f"Failed to create field (selection): {data}")
 
         return data['data']['createProjectV2Field']['clientMutationId']
 
+    def create_fields(self, project_id, fields):
+        '''create_field in batches, fields are (data_type, name, options), returns error per field'''
+        results = []
+        for start in range(0, len(fields), self.BATCH_SIZE):
+            batch = fields[start:start + self.BATCH_SIZE]
+            aliases = [f"f{index}" for index in range(len(batch))]
+            arguments = ['$projectId: ID!']
+            operations = []
+            variables = {"projectId": project_id}
+            for index, (data_type, name, options) in enumerate(batch):
+                arguments.append(f"$dataType{index}: ProjectV2CustomFieldType!, $name{index}: String!")
+                selection = ''
+                if options is not None:
+                    arguments.append(f"$options{index}: [ProjectV2SingleSelectFieldOptionInput!]!")
+                    selection = f"\n            singleSelectOptions: $options{index}"
+                    variables[f"options{index}"] = options
+                operations.append(f'''
+          f{index}: createProjectV2Field(input: {{
+            projectId: $projectId
+            dataType: $dataType{index}
+            name: $name{index}{selection}
+          }}) {{
+            clientMutationId
+          }}''')
+                variables[f"dataType{index}"] = data_type
+                variables[f"name{index}"] = name
+            query = f'''
+        mutation({', '.join(arguments)}) {{{''.join(operations)}
+        }}
+        '''
+            data = self.session.post(query, variables,
+                                     lambda batch=batch, aliases=aliases: self.reconcile_fields(project_id, batch, aliases))
+            errors = batch_errors(data, aliases)
+            # fields the reconciliation found not applied are sent again
+            resend = [field for field, alias in zip(batch, aliases) if errors[alias] == NOT_APPLIED]
+            resent = iter(self.create_fields(project_id, resend))
+            results.extend(next(resent) if errors[alias] == NOT_APPLIED else errors[alias] for alias in aliases)
+        return results
+
+    def reconcile_fields(self, project_id, fields, aliases):
+        '''Get response of a field batch from the fields that exist, None if none was applied'''
+        project = Project(project_id=project_id)
+        project.fetch_fields(self)
+        names = {field['name'] for page in project.fields for field in page}
+        if not any(name in names for _, name, _ in fields):
+            return None
+        data = {alias: {'clientMutationId': None} for (_, name, _), alias in zip(fields, aliases) if name in names}
+        errors = [{'path': [alias], 'message': NOT_APPLIED}
+                  for (_, name, _), alias in zip(fields, aliases) if name not in names]
+        return {'data': data, 'errors': errors}
+
     def get_content(self, repository, number):
         '''get_content'''
         query = '''
@@ -683,8 +1015,7 @@ class GitHub:
             "repository": repository,
             "number": number
         }
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        data = self.session.post(query, variables)
         if 'errors' in data:
             error_messages = [error.get('message', str(error)) for error in data['errors']]
             raise ValueError(f"Failed to get contents: {'; '.join(error_messages)}")
@@ -708,35 +1039,20 @@ class GitHub:
             "projectId": project_id,
             "contentId": content_id
         }
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        data = self.session.post(query, variables)
         if 'errors' in data:
             raise ValueError(f"Failed to create item: {data}")
         return data['data']['addProjectV2ItemById']['item']
 
     def set_item_field_value(self, project_id, item_id, field_id, value, value_type):
         '''set_field_value'''
-        value_key = {
-            'text': 'text',
-            'iteration': 'iterationId',
-            'selection': 'singleSelectOptionId',
-            'date': 'date',
-            'number': 'number'
-        }.get(value_type)
+        value_key = FIELD_VALUE_KEYS.get(value_type)
 
         if not value_key:
             raise ValueError(f"Invalid value_type: {value_type}")
 
-        value_type_map = {
-            'text': 'String',
-            'iteration': 'String',
-            'selection': 'String',
-            'date': 'Date',
-            'number': 'Float'
-        }
-
         query = f'''
-        mutation($projectId: ID!, $itemId: ID!, $fieldId: ID!, $value: {value_type_map[value_type]}!) {{
+        mutation($projectId: ID!, $itemId: ID!, $fieldId: ID!, $value: {FIELD_VALUE_GRAPHQL_TYPES[value_type]}!) {{
           updateProjectV2ItemFieldValue(input: {{
             projectId: $projectId
             itemId: $itemId
@@ -757,8 +1073,7 @@ class GitHub:
             "fieldId": field_id,
             "value": value
         }
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        data = self.session.post(query, variables)
         if 'errors' in data:
             raise ValueError(f"Failed to set item field value for {value_type}: {data}")
         return data['data']['updateProjectV2ItemFieldValue']['projectV2Item']['id']
@@ -803,12 +1118,115 @@ class GitHub:
             "title": title,
             "body": body
         }
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        data = self.session.post(query, variables)
         if 'errors' in data:
             raise ValueError(f"Failed to create draft issue: {data}")
         return data['data']['addProjectV2DraftIssue']['projectItem']['id']
 
+    def add_draft_issues(self, project_id, drafts):
+        '''add_draft_issues in batches, drafts are (title, body), returns (item_id, error) per draft'''
+        results = []
+        for start in range(0, len(drafts), self.BATCH_SIZE):
+            batch = drafts[start:start + self.BATCH_SIZE]
+            aliases = [f"d{index}" for index in range(len(batch))]
+            arguments = ['$projectId: ID!']
+            operations = []
+            variables = {"projectId": project_id}
+            for index, (title, body) in enumerate(batch):
+                arguments.append(f"$title{index}: String!, $body{index}: String")
+                operations.append(f'''
+          d{index}: addProjectV2DraftIssue(input: {{
+            projectId: $projectId
+            title: $title{index}
+            body: $body{index}
+          }}) {{
+            projectItem {{
+              id
+            }}
+          }}''')
+                variables[f"title{index}"] = title
+                variables[f"body{index}"] = body
+            query = f'''
+        mutation({', '.join(arguments)}) {{{''.join(operations)}
+        }}
+        '''
+            data = self.session.post(query, variables,
+                                     lambda batch=batch, aliases=aliases: self.reconcile_drafts(project_id, batch, aliases))
+            errors = batch_errors(data, aliases)
+            # drafts the reconciliation found not applied are sent again
+            resend = [draft for draft, alias in zip(batch, aliases) if errors[alias] == NOT_APPLIED]
+            resent = iter(self.add_draft_issues(project_id, resend))
+            for alias in aliases:
+                if errors[alias] == NOT_APPLIED:
+                    results.append(next(resent))
+                elif errors[alias]:
+                    results.append((None, errors[alias]))
+                else:
+                    results.append((data['data'][alias]['projectItem']['id'], None))
+        return results
+
+    def reconcile_drafts(self, project_id, drafts, aliases):
+        '''Get response of a draft batch from the drafts that exist, None if none was applied'''
+        _, items = self.get_single_project_for_import(project_id)
+        # title -> ids of the drafts with the title, a batch can hold the same title more than once
+        draft_ids = {}
+        for item in items:
+            if item.content_type == ProjectV2Item.DRAFT_ISSUE:
+                draft_ids.setdefault(item.title, []).append(item.id)
+        data = {}
+        errors = []
+        occurrences = {}
+        for (title, _), alias in zip(drafts, aliases):
+            # the n-th draft with a title in the batch matches the n-th existing draft with the title
+            occurrence = occurrences.get(title, 0)
+            occurrences[title] = occurrence + 1
+            ids = draft_ids.get(title, [])
+            if occurrence < len(ids):
+                data[alias] = {'projectItem': {'id': ids[occurrence]}}
+            else:
+                errors.append({'path': [alias], 'message': NOT_APPLIED})
+        if not data:
+            return None
+        return {'data': data, 'errors': errors}
+
+    def set_item_field_values(self, project_id, updates):
+        '''set_field_values in batches, updates are (item_id, field_id, value, value_type), returns error per update'''
+        results = []
+        for start in range(0, len(updates), self.BATCH_SIZE):
+            batch = updates[start:start + self.BATCH_SIZE]
+            aliases = [f"u{index}" for index in range(len(batch))]
+            arguments = ['$projectId: ID!']
+            operations = []
+            variables = {"projectId": project_id}
+            for index, (item_id, field_id, value, value_type) in enumerate(batch):
+                if value_type not in FIELD_VALUE_KEYS:
+                    raise ValueError(f"Invalid value_type: {value_type}")
+                arguments.append(f"$item{index}: ID!, $field{index}: ID!, $value{index}: {FIELD_VALUE_GRAPHQL_TYPES[value_type]}!")
+                operations.append(f'''
+          u{index}: updateProjectV2ItemFieldValue(input: {{
+            projectId: $projectId
+            itemId: $item{index}
+            fieldId: $field{index}
+            value: {{
+                {FIELD_VALUE_KEYS[value_type]}: $value{index}
+              }}
+          }}) {{
+            projectV2Item {{
+              id
+            }}
+          }}''')
+                variables[f"item{index}"] = item_id
+                variables[f"field{index}"] = field_id
+                variables[f"value{index}"] = value
+            query = f'''
+        mutation({', '.join(arguments)}) {{{''.join(operations)}
+        }}
+        '''
+            data = self.session.post(query, variables)
+            errors = batch_errors(data, aliases)
+            results.extend(errors[alias] for alias in aliases)
+        return results
+
     def get_project_items_count(self, project_id):
         '''get_project_items_count'''
         query = '''
@@ -825,8 +1243,32 @@ class GitHub:
         variables = {
             "projectId": project_id
         }
-        github_session = GitHubSession(self.endpoint, self.headers)
-        data = github_session.post(query, variables)
+        data = self.session.post(query, variables)
         if 'errors' in data:
             raise ValueError(f"Failed to get project items count: {data}")
         return data['data']['node']['items']['totalCount']
+
+    def get_projects_updated_at(self, project_ids):
+        '''get_projects_updated_at, returns {project_id: updatedAt}'''
+        query = '''
+        query($ids: [ID!]!) {
+          nodes(ids: $ids) {
+            ... on ProjectV2 {
+              id
+              updatedAt
+            }
+          }
+        }
+        '''
+        updated_at = {}
+        for start in range(0, len(project_ids), 100):
+            variables = {
+                "ids": project_ids[start:start + 100]
+            }
+            data = self.session.post(query, variables)
+            if 'errors' in data:
+                raise ValueError(f"Failed to get projects updated at: {data}")
+            for node in data['data']['nodes']:
+                if node:
+                    updated_at[node['id']] = node['updatedAt']
+        return updated_at
@@ -1,18 +1,30 @@
 #!/usr/bin/env python3
 # -*- coding: utf_8 -*-
 '''githubsession.py'''
+import logging
+import threading
+import time
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from util.idempotency import AmbiguousResponse, IntentJournal, is_idempotent
+from util.profiler import profiler
+from util.progress import progress
+from util.responsecache import is_mutation
+from util.tokenpool import TokenPool
+
+# connections kept per host, enough for the clients sharing a session
+POOL_SIZE = 32
 
 def create_session():
     '''Create session'''
+    # POST is retried by GitHubSession, mutations must not be resent blindly
     retry_strategy = Retry(
         total=3,
         status_forcelist=[504],
-        allowed_methods=["HEAD", "GET", "OPTIONS", "POST"]
+        allowed_methods=["HEAD", "GET", "OPTIONS"]
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=POOL_SIZE)
     session = requests.Session()
     session.mount("https://", adapter)
     session.mount("http://", adapter)
@@ -20,16 +32,168 @@ def create_session():
 
 class GitHubSession:
     '''GitHub Session'''
-    def __init__(self, endpoint, headers):
+    # optional ResponseCache for read queries, set by the entry points
+    cache = None
+    # optional Cassette to record or replay traffic, set by the entry points
+    cassette = None
+    # optional IntentJournal of mutations, set by the entry points
+    journal = None
+    # optional ConcurrencyController of in-flight requests, set by the entry points
+    limiter = None
+    TIMEOUT = 120
+    RETRIES = 3
+    AMBIGUOUS_STATUS = (500, 502, 503, 504)
+
+    def __init__(self, endpoint, headers, token_pool=None):
         self.endpoint = endpoint
         self.headers = headers
+        self.token_pool = token_pool
         self.session = create_session()
+        if self.cassette and token_pool:
+            self.cassette.secrets.extend(token_pool.tokens)
+
+    def workers(self):
+        '''Get the number of threads to send requests from, one without a concurrency limiter'''
+        return self.limiter.workers() if self.limiter else 1
+
+    def post(self, query, variables, reconcile=None):
+        '''Post request, reconcile looks up whether an ambiguously failed mutation was applied'''
+        with profiler.phase('mutate' if is_mutation(query) else 'fetch'):
+            return self.dispatch(query, variables, reconcile)
+
+    def dispatch(self, query, variables, reconcile=None):
+        '''Serve request from cassette, cache or the endpoint'''
+        if self.cassette and self.cassette.replaying:
+            return self.cassette.replay(query, variables)
+
+        if is_mutation(query):
+            try:
+                return self.mutate(query, variables, reconcile)
+            finally:
+                if self.cache is not None:
+                    self.cache.invalidate(variables)
+
+        if self.cache is None:
+            return self.fetch(query, variables)
+
+        data = self.cache.get(query, variables)
+        if data is None:
+            data = self.fetch(query, variables)
+            if 'data' in data and 'errors' not in data:
+                self.cache.put(query, variables, data)
+        elif self.cassette:
+            # cache hits are recorded too, a replay without the cache needs them
+            self.cassette.record(query, variables, 200, 0, data)
+        return data
+
+    def fetch(self, query, variables):
+        '''Send read query, retried on ambiguous failures'''
+        for attempt in range(self.RETRIES):
+            try:
+                return self.send(query, variables)
+            except AmbiguousResponse as error:
+                logging.warning('Query Failed, retrying - %s', str(error))
+                time.sleep(2 ** attempt)
+        return self.send(query, variables)
+
+    def mutate(self, query, variables, reconcile):
+        '''Send mutation, resent after an ambiguous failure only if it was not applied'''
+        intent_id = self.journal.record(query, variables) if self.journal else None
+        state = IntentJournal.FAILED
+        try:
+            for attempt in range(self.RETRIES + 1):
+                try:
+                    data = self.send(query, variables)
+                    state = IntentJournal.DONE
+                    return data
+                except AmbiguousResponse as error:
+                    if attempt == self.RETRIES:
+                        raise
+                    idempotent = is_idempotent(query)
+                    if not idempotent and reconcile is None:
+                        raise
+                    time.sleep(2 ** attempt)
+                    if idempotent:
+                        logging.warning('Mutation Failed, resending - %s', str(error))
+                        continue
+                    if self.cache is not None:
+                        self.cache.invalidate(variables)
+                    data = reconcile()
+                    if data is not None:
+                        logging.warning('Mutation Failed, found applied - %s', str(error))
+                        state = IntentJournal.RECONCILED
+                        return data
+                    logging.warning('Mutation Failed, not applied, resending - %s', str(error))
+        finally:
+            if intent_id:
+                self.journal.complete(intent_id, state)
+
+    def request(self, query, variables, headers):
+        '''Post to the endpoint within the concurrency limit, returns (response, elapsed)'''
+        limit = self.limiter.limit(query) if self.limiter else None
+        started = limit.acquire() if limit else None
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                self.endpoint,
+                json={'query': query, 'variables': variables},
+                headers=headers,
+                timeout=self.TIMEOUT
+            )
+        except (requests.Timeout, requests.ConnectionError) as error:
+            if limit:
+                limit.release(started, time.perf_counter() - start, False)
+            raise AmbiguousResponse(str(error)) from error
+        elapsed = time.perf_counter() - start
+        if limit:
+            healthy = response.status_code not in (403, 429) and response.status_code < 500
+            limit.release(started, elapsed, healthy)
+        return response, elapsed
+
+    def send(self, query, variables):
+        '''Send request to the endpoint'''
+        while True:
+            headers = self.headers
+            token = None
+            if self.token_pool:
+                token = self.token_pool.acquire()
+                headers = dict(self.headers, Authorization=f'bearer {token}')
+
+            response, elapsed = self.request(query, variables, headers)
+
+            if token:
+                self.token_pool.update(token, response.headers)
+            progress.request(self.token_pool.headroom() if token else None,
+                             self.limiter.limits() if self.limiter else None)
+            if token and response.status_code in (403, 429) and \
+                response.headers.get('x-ratelimit-remaining') == '0':
+                # exhausted token is parked by update, retry with another one
+                continue
+            if response.status_code in (403, 429) and 'retry-after' in response.headers:
+                wait = int(response.headers['retry-after'])
+                logging.warning('Secondary rate limit hit, retrying after %d seconds', wait)
+                time.sleep(wait)
+                continue
+            if response.status_code in self.AMBIGUOUS_STATUS:
+                raise AmbiguousResponse(f"{response.status_code} {response.reason}")
+
+            data = response.json()
+            if self.cassette:
+                self.cassette.record(query, variables, response.status_code, elapsed, data)
+            return data
+
+class SessionRegistry:
+    '''One token pool and session per token, shared by the clients of a process'''
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, endpoint, headers, token):
+        '''Get the token pool and session of a token, created on first use'''
+        with self.lock:
+            if token not in self.sessions:
+                token_pool = TokenPool(token)
+                self.sessions[token] = (token_pool, GitHubSession(endpoint, headers, token_pool))
+            return self.sessions[token]
 
-    def post(self, query, variables):
-        '''Post request'''
-        response = self.session.post(
-            self.endpoint,
-            json={'query': query, 'variables': variables},
-            headers=self.headers
-        )
-        return response.json()
+sessions = SessionRegistry()
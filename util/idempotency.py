@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''idempotency.py'''
+import atexit
+import logging
+import re
+import threading
+import time
+import uuid
+from util.comon import Common
+
+MUTATION_PATTERN = re.compile(r'(\w+)\s*\(\s*input\s*:')
+
+# mutations that leave the same state when applied twice
+IDEMPOTENT_MUTATIONS = frozenset([
+    'updateProjectV2',
+    'updateProjectV2ItemFieldValue',
+    'addProjectV2ItemById'
+])
+
+# placeholder error of a batched operation the reconciliation found not applied
+NOT_APPLIED = 'Not applied'
+
+class AmbiguousResponse(Exception):
+    '''Request failed without telling whether it was applied (timeout, 5xx)'''
+
+def mutation_names(query):
+    '''Get mutation names of a (batched) mutation document'''
+    return sorted(set(MUTATION_PATTERN.findall(query)))
+
+def is_idempotent(query):
+    '''Check if every mutation of the document can be resent safely'''
+    names = mutation_names(query)
+    return bool(names) and all(name in IDEMPOTENT_MUTATIONS for name in names)
+
+class IntentJournal:
+    '''Append-only journal of mutation intents and their outcome, compacted to unfinished intents on start and close'''
+    INTENT = 'intent'
+    DONE = 'done'
+    RECONCILED = 'reconciled'
+    FAILED = 'failed'
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        # intents of this run without an outcome
+        self.intents = {}
+        previous = self.pending(file_path)
+        for intent in previous:
+            logging.warning('Unfinished Mutation from previous run, check for duplicates - %s %s %s',
+                            intent['id'], intent['operation'], intent['variables'])
+        # unfinished intents of the previous run are kept until this run closes cleanly
+        self.compact(previous)
+        self.file = open(file_path, 'a', encoding='utf-8')
+        atexit.register(self.close)
+
+    @staticmethod
+    def pending(file_path):
+        '''Get intents without an outcome'''
+        intents = {}
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = Common.json_loads(line)
+                    except ValueError:
+                        # a crash while writing leaves a truncated line
+                        logging.warning('Unreadable Journal Entry Skipped - %s: %s', file_path, line.strip())
+                        continue
+                    if entry['state'] == IntentJournal.INTENT:
+                        intents[entry['id']] = entry
+                    else:
+                        intents.pop(entry['id'], None)
+        except FileNotFoundError:
+            pass
+        return list(intents.values())
+
+    def compact(self, intents):
+        '''Rewrite the journal atomically with only the given intents'''
+        Common.write_json_atomic(self.file_path, intents, lines=True)
+
+    def write(self, entry):
+        '''Write journal entry'''
+        with self.lock:
+            self.file.write(Common.json_dumps(entry) + '\n')
+            self.file.flush()
+
+    def record(self, query, variables):
+        '''Record intent before sending, returns intent id'''
+        intent_id = uuid.uuid4().hex
+        entry = {'id': intent_id, 'state': IntentJournal.INTENT, 'time': time.time(),
+                 'operation': ','.join(mutation_names(query)), 'variables': variables}
+        with self.lock:
+            self.intents[intent_id] = entry
+        self.write(entry)
+        return intent_id
+
+    def complete(self, intent_id, state):
+        '''Record outcome of an intent'''
+        with self.lock:
+            self.intents.pop(intent_id, None)
+        self.write({'id': intent_id, 'state': state, 'time': time.time()})
+
+    def close(self):
+        '''Close journal file, completed intents are dropped'''
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+                self.compact(list(self.intents.values()))
@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''importer.py'''
+import importlib
+
+# import.py cannot be imported with an import statement, import is a keyword
+importer = importlib.import_module('import')
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''logger.py'''
+import atexit
+import itertools
+import logging
+import logging.handlers
+import queue
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+class SampleFilter(logging.Filter):
+    '''Pass one of every N debug records, other levels always pass'''
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self.counter = itertools.count()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        return next(self.counter) % self.rate == 0
+
+def setup_logging(file_path, verbose=False, sample=1):
+    '''Log to file and console from a background thread'''
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.FileHandler(file_path)
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    # callers only enqueue records, writes happen in the listener thread
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    if sample > 1:
+        queue_handler.addFilter(SampleFilter(sample))
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(logging.DEBUG if verbose else logging.INFO)
+    return listener
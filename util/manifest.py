@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''manifest.py'''
+import hashlib
+import os
+import threading
+import time
+from util.columnar import decode_values, is_columnar
+from util.comon import Common
+from util.github import ProjectV2Item
+
+# dataset -> folder of its files
+DATASET_FOLDERS = {
+    'project': Common.FOLDER_PATH,
+    'fields': Common.FOLDER_FIELDS_PATH,
+    'views': Common.FOLDER_VIEWS_PATH,
+    'items': Common.FOLDER_ITEM_PATH
+}
+
+def dataset_path(project_id, dataset, root=''):
+    '''Get export file path of a dataset of a project'''
+    return os.path.join(root, DATASET_FOLDERS[dataset], f"{project_id}.json")
+
+def checksum(content):
+    '''Get checksum of file content'''
+    return hashlib.sha256(content).hexdigest()
+
+def item_counts(data):
+    '''Count items and draft items of items data in json or columnar format without parsing the items'''
+    if is_columnar(data):
+        drafts = decode_values(data['content_types'], data['content_type']).count(ProjectV2Item.DRAFT_ISSUE)
+        return {'items': data['count'], 'drafts': drafts}
+    items = 0
+    drafts = 0
+    for page in data or []:
+        for node in page:
+            if 'content' in node:
+                items = items + 1
+                content = node['content']
+                if content and 'repository' not in content:
+                    drafts = drafts + 1
+    return {'items': items, 'drafts': drafts}
+
+def page_count(data):
+    '''Count fields or views of pages'''
+    return sum(len(page) for page in data or [])
+
+class Manifest:
+    '''Counts, byte sizes, checksums and source update time of the exported datasets per project'''
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        try:
+            self.projects = Common.read_json_from_file(file_path).get('projects', {})
+        except FileNotFoundError:
+            self.projects = {}
+
+    def get(self, project_id):
+        '''Get the entry of a project, None if not exported'''
+        return self.projects.get(project_id)
+
+    def checksum(self, project_id, dataset):
+        '''Get checksum of an exported dataset, None if not exported'''
+        return (self.projects.get(project_id) or {}).get('checksums', {}).get(dataset)
+
+    def record(self, project_id, dataset, content, counts=None, updated_at=None):
+        '''Record an exported dataset from the bytes written, updated_at is the source project update time'''
+        with self.lock:
+            entry = self.projects.setdefault(project_id, {'bytes': {}, 'checksums': {}, 'updated_at': {}})
+            entry['bytes'][dataset] = len(content)
+            entry['checksums'][dataset] = checksum(content)
+            entry['updated_at'][dataset] = updated_at
+            entry.update(counts or {})
+            entry['exported_at'] = time.time()
+
+    def unchanged(self, project_id, dataset, updated_at):
+        '''Check if the exported dataset is as current as the source project'''
+        entry = self.projects.get(project_id)
+        return updated_at is not None and entry is not None and entry['updated_at'].get(dataset) == updated_at
+
+    def write(self):
+        '''Write the manifest next to the export folders'''
+        with self.lock:
+            Common.write_json_to_file(self.file_path, {'projects': self.projects})
+
+class ImportedExports:
+    '''Checksums of the exported datasets each project was imported from, to skip unchanged exports'''
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        try:
+            self.projects = Common.read_json_from_file(file_path, archive=False)
+        except FileNotFoundError:
+            self.projects = {}
+
+    def unchanged(self, manifest, project_id, dataset, mapped_project_id):
+        '''Check if the dataset was imported into the same target project from the same export'''
+        imported = self.projects.get(project_id, {}).get(dataset)
+        current = manifest.checksum(project_id, dataset)
+        return current is not None and imported == {'checksum': current, 'mapped_project_id': mapped_project_id}
+
+    def record(self, manifest, project_id, dataset, mapped_project_id):
+        '''Record an imported dataset and write atomically'''
+        current = manifest.checksum(project_id, dataset)
+        if current is None:
+            return
+        with self.lock:
+            self.projects.setdefault(project_id, {})[dataset] = {'checksum': current, 'mapped_project_id': mapped_project_id}
+            Common.write_json_atomic(self.file_path, self.projects)
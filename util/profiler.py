@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''profiler.py'''
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+class PhaseStats:
+    '''Accumulated time of a phase'''
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_memory = 0
+
+class Phase:
+    '''Running phase, time spent in nested phases is excluded'''
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def __enter__(self):
+        self.profiler.push(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.pop(self)
+        return False
+
+class Profiler:
+    '''Per-phase wall/CPU time, cProfile and peak memory of a run'''
+    PHASES = ('discovery', 'fetch', 'serialize', 'resolve', 'mutate')
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.use_cprofile = False
+        self.trace_memory = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stats = {}
+        self.profiles = {}
+        self.memory = []
+
+    def enable(self, directory, use_cprofile=False, trace_memory=False):
+        '''Enable profiling'''
+        self.enabled = True
+        self.directory = directory
+        self.use_cprofile = use_cprofile
+        self.trace_memory = trace_memory
+        os.makedirs(directory, exist_ok=True)
+        if trace_memory:
+            tracemalloc.start()
+
+    def phase(self, name):
+        '''Get context manager measuring a phase'''
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return Phase(self, name)
+
+    def stack(self):
+        '''Get phase stack of the current thread'''
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def profile(self, name):
+        '''Get cProfile of a phase, only the main thread is profiled'''
+        if not self.use_cprofile or threading.current_thread() is not threading.main_thread():
+            return None
+        if name not in self.profiles:
+            self.profiles[name] = cProfile.Profile()
+        return self.profiles[name]
+
+    def push(self, phase):
+        '''Start phase and pause the enclosing one'''
+        stack = self.stack()
+        if stack:
+            self.pause(stack[-1])
+        else:
+            self.boundary(phase.name, 'start')
+        stack.append(phase)
+        self.resume(phase)
+
+    def pop(self, phase):
+        '''Stop phase and resume the enclosing one'''
+        stack = self.stack()
+        self.pause(phase)
+        stack.pop()
+        with self.lock:
+            stats = self.stats.setdefault(phase.name, PhaseStats())
+            stats.calls = stats.calls + 1
+            stats.wall = stats.wall + phase.wall
+            stats.cpu = stats.cpu + phase.cpu
+        if stack:
+            self.resume(stack[-1])
+        else:
+            self.boundary(phase.name, 'end')
+
+    def resume(self, phase):
+        '''Resume phase clocks'''
+        phase.wall_start = time.perf_counter()
+        phase.cpu_start = time.thread_time()
+        profile = self.profile(phase.name)
+        if profile:
+            profile.enable()
+
+    def pause(self, phase):
+        '''Pause phase clocks'''
+        profile = self.profile(phase.name)
+        if profile:
+            profile.disable()
+        phase.wall = phase.wall + time.perf_counter() - phase.wall_start
+        phase.cpu = phase.cpu + time.thread_time() - phase.cpu_start
+
+    def boundary(self, name, event):
+        '''Take memory snapshot at top level phase boundary'''
+        if not self.trace_memory:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        with self.lock:
+            if event == 'end':
+                stats = self.stats.setdefault(name, PhaseStats())
+                stats.peak_memory = max(stats.peak_memory, peak)
+            self.memory.append({'time': time.time(), 'phase': name, 'event': event,
+                                'current': current, 'peak': peak})
+        tracemalloc.reset_peak()
+
+    def write(self, name):
+        '''Write profile results to the profile directory'''
+        if not self.enabled:
+            return
+        summary = {phase: {'calls': stats.calls,
+                           'wall_seconds': round(stats.wall, 4),
+                           'cpu_seconds': round(stats.cpu, 4),
+                           'peak_memory_bytes': stats.peak_memory}
+                   for phase, stats in self.stats.items()}
+        for phase, stats in summary.items():
+            logging.info('Profile - %s: Calls %s, Wall %ss, CPU %ss, Peak Memory %s bytes',
+                         phase, stats['calls'], stats['wall_seconds'], stats['cpu_seconds'],
+                         stats['peak_memory_bytes'])
+
+        with open(os.path.join(self.directory, f"{name}_summary.json"), 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=4)
+        for phase, profile in self.profiles.items():
+            profile.dump_stats(os.path.join(self.directory, f"{name}_{phase}.prof"))
+        if self.trace_memory:
+            with open(os.path.join(self.directory, f"{name}_memory.json"), 'w', encoding='utf-8') as file:
+                json.dump(self.memory, file, indent=4)
+            top_stats = tracemalloc.take_snapshot().statistics('lineno')[:20]
+            with open(os.path.join(self.directory, f"{name}_memory_top.txt"), 'w', encoding='utf-8') as file:
+                file.write('\n'.join(str(stat) for stat in top_stats))
+
+profiler = Profiler()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''progress.py'''
+import collections
+import logging
+import threading
+import time
+from util.comon import Common
+
+class ProjectProgress:
+    '''Progress of a single project'''
+    def __init__(self, project_id, total):
+        self.project_id = project_id
+        self.total = total
+        self.processed = 0
+        self.started = time.time()
+
+class Progress:
+    '''Progress, throughput and ETA of long-running operations'''
+    WINDOW = 60
+    INTERVAL = 30
+
+    def __init__(self):
+        self.enabled = False
+        self.status_file = None
+        self.interval = Progress.INTERVAL
+        self.lock = threading.Lock()
+        # operations started while combined add to one total, e.g. the organizations of a run
+        self.combined = False
+        self.reset('')
+
+    def reset(self, operation, total_projects=0):
+        '''Reset counters for a new operation'''
+        self.operation = operation
+        self.total_projects = total_projects
+        self.completed_projects = 0
+        self.completed_items = 0
+        self.processed = 0
+        self.requests = 0
+        self.headroom = None
+        self.limits = None
+        self.projects = {}
+        self.item_window = collections.deque()
+        self.request_window = collections.deque()
+        self.started = time.time()
+        self.last_report = self.started
+
+    def enable(self, status_file, interval=INTERVAL):
+        '''Enable progress reporting'''
+        self.enabled = interval > 0
+        self.status_file = status_file
+        self.interval = interval
+
+    def combine(self, operation):
+        '''Report later operations as one, their projects add to the total'''
+        if not self.enabled:
+            return
+        with self.lock:
+            self.reset(operation)
+            self.combined = True
+
+    def start(self, operation, total_projects):
+        '''Start operation over projects'''
+        if not self.enabled:
+            return
+        with self.lock:
+            if self.combined:
+                self.total_projects = self.total_projects + total_projects
+            else:
+                self.reset(operation, total_projects)
+
+    def start_project(self, project_id, total_items):
+        '''Start processing project items'''
+        if not self.enabled:
+            return
+        with self.lock:
+            self.projects[project_id] = ProjectProgress(project_id, total_items)
+
+    def advance(self, project_id, count=1):
+        '''Record processed items of project'''
+        if not self.enabled:
+            return
+        with self.lock:
+            project = self.projects.get(project_id)
+            if project is None:
+                project = self.projects[project_id] = ProjectProgress(project_id, None)
+            project.processed = project.processed + count
+            self.processed = self.processed + count
+            self.item_window.append((time.time(), count))
+        self.report()
+
+    def finish_project(self, project_id):
+        '''Finish processing project'''
+        if not self.enabled:
+            return
+        with self.lock:
+            project = self.projects.pop(project_id, None)
+            self.completed_projects = self.completed_projects + 1
+            if project:
+                self.completed_items = self.completed_items + project.processed
+        self.report()
+
+    def request(self, headroom=None, limits=None):
+        '''Record API request, remaining rate-limit budget and concurrency limits'''
+        if not self.enabled:
+            return
+        with self.lock:
+            self.requests = self.requests + 1
+            self.request_window.append(time.time())
+            if headroom is not None:
+                self.headroom = headroom
+            if limits is not None:
+                self.limits = limits
+        self.report()
+
+    def rates(self, now):
+        '''Get items/sec and requests/sec over the moving window'''
+        while self.item_window and now - self.item_window[0][0] > Progress.WINDOW:
+            self.item_window.popleft()
+        while self.request_window and now - self.request_window[0] > Progress.WINDOW:
+            self.request_window.popleft()
+        span = min(max(now - self.started, 1), Progress.WINDOW)
+        return sum(count for _, count in self.item_window) / span, len(self.request_window) / span
+
+    def status(self):
+        '''Get current status'''
+        now = time.time()
+        with self.lock:
+            items_per_sec, requests_per_sec = self.rates(now)
+            projects = []
+            remaining = 0
+            for project in self.projects.values():
+                eta = None
+                if project.total is not None:
+                    left = max(project.total - project.processed, 0)
+                    remaining = remaining + left
+                    eta = left / items_per_sec if items_per_sec else None
+                projects.append({
+                    'project_id': project.project_id,
+                    'processed': project.processed,
+                    'total': project.total,
+                    'eta_seconds': eta
+                })
+
+            # projects not started yet are estimated by the average size of completed projects
+            pending = max(self.total_projects - self.completed_projects - len(self.projects), 0)
+            if pending and self.completed_projects:
+                remaining = remaining + pending * self.completed_items / self.completed_projects
+            eta = remaining / items_per_sec if items_per_sec and (remaining or not pending) else None
+
+            return {
+                'operation': self.operation,
+                'elapsed_seconds': round(now - self.started, 1),
+                'projects_completed': self.completed_projects,
+                'projects_total': self.total_projects,
+                'items_processed': self.processed,
+                'items_per_sec': round(items_per_sec, 2),
+                'requests': self.requests,
+                'requests_per_sec': round(requests_per_sec, 2),
+                'rate_limit_remaining': self.headroom,
+                'concurrency_limits': self.limits,
+                'eta_seconds': round(eta) if eta is not None else None,
+                'projects': projects
+            }
+
+    def report(self, force=False):
+        '''Log progress and write status file periodically'''
+        if not self.enabled:
+            return
+        now = time.time()
+        with self.lock:
+            if not force and now - self.last_report < self.interval:
+                return
+            self.last_report = now
+
+        status = self.status()
+        logging.info('Progress - %s: Projects %s/%s, Items %s, %s items/sec, %s requests/sec, Rate Limit Remaining %s, Concurrency %s, ETA %s sec',
+                     status['operation'], status['projects_completed'], status['projects_total'],
+                     status['items_processed'], status['items_per_sec'], status['requests_per_sec'],
+                     status['rate_limit_remaining'], status['concurrency_limits'], status['eta_seconds'])
+        if self.status_file:
+            Common.write_json_atomic(self.status_file, status, pretty=True)
+
+progress = Progress()
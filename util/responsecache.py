@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''responsecache.py'''
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from util.comon import Common
+
+def is_mutation(query):
+    '''Check if query is a mutation'''
+    return query.lstrip().startswith('mutation')
+
+def project_scope(variables):
+    '''Get the project the query or mutation touches'''
+    return variables.get('projectId') or variables.get('id')
+
+class ResponseCache:
+    '''On-disk cache of read query responses'''
+    TTL = 24 * 60 * 60
+    MAX_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, file_path, ttl=TTL, max_size=MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(file_path, check_same_thread=False)
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                scope TEXT,
+                response TEXT,
+                size INTEGER,
+                created REAL,
+                accessed REAL
+            )''')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope)')
+        self.connection.commit()
+
+    @staticmethod
+    def key(query, variables):
+        '''Get cache key from query hash and variables'''
+        payload = json.dumps([query, variables], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, query, variables):
+        '''Get cached response, None if missing or expired'''
+        key = self.key(query, variables)
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT response, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self.connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self.connection.commit()
+                return None
+            self.connection.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self.connection.commit()
+        return Common.json_loads(row[0])
+
+    def put(self, query, variables, data):
+        '''Store response'''
+        response = Common.json_dumps(data)
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (self.key(query, variables), project_scope(variables), response, len(response), now, now))
+            self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        '''Evict least recently used responses over the size limit'''
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_size:
+            return
+        rows = self.connection.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            self.connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total = total - size
+
+    def invalidate(self, variables):
+        '''Invalidate cached responses for the project a mutation touched'''
+        scope = project_scope(variables)
+        with self.lock:
+            if scope:
+                self.connection.execute('DELETE FROM responses WHERE scope = ?', (scope,))
+            else:
+                # mutations without a project (e.g. createProjectV2) change organization level data
+                self.connection.execute('DELETE FROM responses WHERE scope IS NULL')
+            self.connection.commit()
+        logging.debug('Cache invalidated - %s', scope)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''tokenpool.py'''
+import logging
+import threading
+import time
+
+class TokenPool:
+    '''Pool of tokens rotated by remaining rate-limit budget'''
+    def __init__(self, tokens):
+        if isinstance(tokens, str):
+            tokens = tokens.split(',')
+        self.tokens = [token.strip() for token in tokens if token and token.strip()]
+        if not self.tokens:
+            raise KeyError("No token is provided.")
+        self.remaining = {token: None for token in self.tokens}
+        self.reset = {token: 0 for token in self.tokens}
+        # rate-limit points used since the pool was created
+        self.spent = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def is_parked(self, token, now):
+        '''Check if token is exhausted until its reset time'''
+        return self.remaining[token] == 0 and self.reset[token] > now
+
+    def acquire(self):
+        '''Get the token with the largest remaining budget'''
+        while True:
+            with self.lock:
+                now = time.time()
+                available = [token for token in self.tokens if not self.is_parked(token, now)]
+                if available:
+                    # tokens without rate-limit info yet are tried first
+                    return max(available, key=lambda token: (self.remaining[token] is None,
+                                                             self.remaining[token] or 0))
+                wait = min(self.reset.values()) - now
+            logging.warning('All tokens are exhausted, waiting %d seconds for reset', wait)
+            time.sleep(max(wait, 1))
+
+    def update(self, token, headers):
+        '''Update token budget from rate-limit headers'''
+        remaining = headers.get('x-ratelimit-remaining')
+        reset = headers.get('x-ratelimit-reset')
+        if remaining is None:
+            return
+        with self.lock:
+            previous = self.remaining[token]
+            # remaining goes up only when the rate-limit window resets
+            if previous is not None and int(remaining) <= previous:
+                self.spent = self.spent + previous - int(remaining)
+            self.remaining[token] = int(remaining)
+            if reset is not None:
+                self.reset[token] = int(reset)
+            if self.remaining[token] == 0:
+                logging.warning('Token %s is exhausted, parked until %s',
+                                self.mask(token), time.ctime(self.reset[token]))
+
+    def park(self, token, reset):
+        '''Park token until reset time'''
+        with self.lock:
+            self.remaining[token] = 0
+            self.reset[token] = reset
+
+    def headroom(self):
+        '''Get total remaining budget of known tokens'''
+        with self.lock:
+            return sum(value for value in self.remaining.values() if value is not None)
+
+    @staticmethod
+    def mask(token):
+        '''Mask token for logging'''
+        return f"...{token[-4:]}"
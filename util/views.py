@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+'''views.py'''
+from util.comon import Common
+
+# view connections listing fields, sortByFields nodes hold the field under 'field'
+VIEW_FIELD_CONNECTIONS = ('groupByFields', 'verticalGroupByFields', 'fields')
+
+def view_field_nodes(view):
+    '''Get the field nodes a view references'''
+    nodes = [node['field'] for node in (view.get('sortByFields') or {}).get('nodes', []) if node.get('field')]
+    for connection in VIEW_FIELD_CONNECTIONS:
+        nodes.extend(node for node in (view.get(connection) or {}).get('nodes', []) if node)
+    return nodes
+
+def is_normalized(views):
+    '''Check if views reference fields by id only'''
+    for page in views or []:
+        for view in page:
+            for node in view_field_nodes(view):
+                return set(node) == {'id'}
+    return False
+
+def field_reference(field, details):
+    '''Get the field as the full views export has it, details adds options and iterations'''
+    reference = {'id': field['id'], 'name': field['name'], 'dataType': field['dataType']}
+    if details and 'options' in field:
+        reference['options'] = [{'id': option['id'], 'name': option['name']} for option in field['options']]
+    if details and 'configuration' in field:
+        reference['configuration'] = {'iterations': [{'startDate': iteration['startDate'], 'id': iteration['id']}
+                                                     for iteration in field['configuration']['iterations']]}
+    return reference
+
+def join_views(views, fields):
+    '''Join views referencing fields by id with the project fields, unknown ids are kept as is'''
+    index = {field['id']: field for page in fields or [] for field in page if 'id' in field}
+
+    def resolve(node, details):
+        field = index.get(node.get('id'))
+        return field_reference(field, details) if field else node
+
+    joined = []
+    for page in views:
+        joined_page = []
+        for view in page:
+            view = dict(view)
+            if view.get('sortByFields'):
+                view['sortByFields'] = {'nodes': [dict(node, field=resolve(node['field'], False)) if node.get('field') else node
+                                                  for node in view['sortByFields']['nodes']]}
+            for connection in VIEW_FIELD_CONNECTIONS:
+                if view.get(connection):
+                    details = connection == 'fields'
+                    view[connection] = {'nodes': [resolve(node, details) for node in view[connection]['nodes']]}
+            joined_page.append(view)
+        joined.append(joined_page)
+    return joined
+
+def read_views(file_path, fields_file_path):
+    '''Read views from an export file, normalized views are joined with the exported fields'''
+    views = Common.read_json_from_file(file_path)
+    if is_normalized(views):
+        return join_views(views, Common.read_json_from_file(fields_file_path))
+    return views